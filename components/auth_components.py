@@ -9,6 +9,7 @@ for clarity and isolation (e.g., ft_user, ft_authenticated).
 """
 
 import streamlit as st
+import streamlit.components.v1 as components
 from services.auth_service import AuthService
 
 class AuthComponents:
@@ -179,8 +180,6 @@ class AuthComponents:
     @staticmethod
     def terms_modal():
         """Render Terms & Conditions with visible bullets and sticky accept controls."""
-        import streamlit.components.v1 as components
-        
         components.html("""
 <div class="tc-wrap">
   <div class="tc-box">
@@ -157,7 +157,7 @@ class DashboardCharts:
             
             category_spending = {}
             for transaction in transactions:
-                if (transaction.get('date', '').startswith(current_month) and 
+                if (transaction.get('date', '')[:7] == current_month and 
                     transaction.get('type', '').lower() in ['expense']):
                     category = transaction.get('category', 'Other')
                     amount = float(transaction.get('amount', 0))
@@ -220,7 +220,7 @@ class DashboardCharts:
             # Calculate spending by category
             spending_by_category = {}
             for transaction in transactions:
-                if (transaction.get('date', '').startswith(current_month) and 
+                if (transaction.get('date', '')[:7] == current_month and 
                     transaction.get('type', '').lower() in ['expense']):
                     category = transaction.get('category', 'Other')
                     amount = float(transaction.get('amount', 0))
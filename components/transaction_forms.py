@@ -213,7 +213,7 @@ class UtilitiesFormHandler:
             transactions = TransactionService.load_transactions()
             existing_utilities = set()
             for txn in transactions:
-                if (txn.get('date', '').startswith(selected_month) and 
+                if (txn.get('date', '')[:7] == selected_month and 
                     txn.get('category') == 'Utilities'):
                     desc = txn.get('description', '').lower()
                     
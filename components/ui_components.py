@@ -6,6 +6,7 @@ including hero sections, testimonials, quotes, and other visual components.
 """
 
 import streamlit as st
+import streamlit.components.v1 as components
 
 class UIComponents:
     """
@@ -63,8 +64,6 @@ class UIComponents:
     @staticmethod
     def testimonials_section():
         """Render testimonials grid with scroll-triggered animations (Rocket Money inspired)."""
-        import streamlit.components.v1 as components
-        
         html_code = '''<!DOCTYPE html>
 <html><head><meta charset="UTF-8"><meta name="viewport" content="width=device-width,initial-scale=1">
 <style>*{margin:0;padding:0;box-sizing:border-box}body{font-family:-apple-system,BlinkMacSystemFont,'Segoe UI',sans-serif;background:transparent;overflow-x:hidden;padding:40px 20px}.wrapper{max-width:1100px;margin:0 auto}.title{text-align:center;font-size:2rem;font-weight:800;margin-bottom:2.5rem;color:#1F2937;opacity:0;transform:translateY(20px);transition:all 0.6s ease}.title.visible{opacity:1;transform:translateY(0)}.grid{display:grid;grid-template-columns:repeat(2,1fr);gap:20px}@media(max-width:768px){.grid{grid-template-columns:1fr}}.card{background:#fff;border:1px solid #e5e7eb;border-radius:12px;padding:20px;opacity:0;transform:translateY(30px);transition:all 0.6s cubic-bezier(0.4,0,0.2,1);box-shadow:0 1px 3px rgba(0,0,0,0.05)}.card.visible{opacity:1;transform:translateY(0)}.card:hover{border-color:#8b5cf6;box-shadow:0 0 0 2px rgba(139,92,246,0.1),0 4px 12px rgba(0,0,0,0.08)}.stars{color:#fbbf24;font-size:0.9rem;margin-bottom:10px;letter-spacing:1px}.text{color:#374151;font-size:0.95rem;line-height:1.6;margin-bottom:14px}.author{display:flex;align-items:center;gap:10px}.avatar{width:40px;height:40px;border-radius:50%;background:linear-gradient(135deg,#8b5cf6,#06b6d4);display:flex;align-items:center;justify-content:center;color:#fff;font-weight:700;font-size:0.85rem}.info{display:flex;flex-direction:column}.name{font-weight:600;font-size:0.88rem;color:#1f2937}.role{font-size:0.78rem;color:#6b7280}</style>
@@ -101,8 +100,6 @@ class UIComponents:
     @staticmethod
     def social_login_buttons():
         """Render social login buttons (disabled for now)."""
-        import streamlit.components.v1 as components
-        
         components.html('''
         <div class="social-login">
             <button class="social-btn google-btn" disabled style="opacity:0.5;cursor:not-allowed;">
@@ -6,6 +6,7 @@ import os
 class DatabaseConstants:
     """Database configuration constants. DB path can be overridden via FINANCE_TRACKER_DB_PATH for hosting."""
     DB_FILE = os.environ.get('FINANCE_TRACKER_DB_PATH', 'finance_tracker.db')
+    AUDIT_DB_FILE = os.environ.get('FINANCE_TRACKER_AUDIT_DB_PATH', 'finance_tracker_audit.db')
     TEST_DB_PREFIX = 'test_'
 
 class TransactionTypes:
@@ -250,7 +250,7 @@ class FinanceApp:
                     page = selected_page
                     
                     # Performance monitoring
-                    start_time = time.time()
+                    start_time = time.perf_counter()
                     
                     # Show contextual tooltip for current page
                     OnboardingGuide.show_page_tooltip(page)
@@ -278,7 +278,7 @@ class FinanceApp:
                             self.pages[page].show()
                         
                         # Performance monitoring
-                        load_time = time.time() - start_time
+                        load_time = time.perf_counter() - start_time
                         if load_time > 2.0:  # Log slow page loads
                             self.logger.warning(f"Slow page load: {page} took {load_time:.2f}s")
                         
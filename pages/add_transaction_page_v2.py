@@ -175,15 +175,17 @@ class AddTransactionPageV2:
         """Show monthly transaction summary"""
         try:
             from services.financial_data_service import TransactionService
-            transactions = TransactionService.load_transactions()
             
             current_month = datetime.now().strftime('%Y-%m')
-            current_transactions = [t for t in transactions if t.get('date', '').startswith(current_month)]
+            # Only this month onwards is read from the database
+            transactions = TransactionService.load_transactions(since=current_month)
+            current_transactions = [t for t in transactions if t.get('date', '')[:7] == current_month]
             
-            total_income = sum(float(t.get('amount', 0)) for t in current_transactions if t.get('type') == 'Income')
-            total_expenses = sum(float(t.get('amount', 0)) for t in current_transactions if t.get('type') == 'Expense')
-            total_investments = sum(float(t.get('amount', 0)) for t in current_transactions if t.get('type') == 'Investment')
-            total_transfers = sum(float(t.get('amount', 0)) for t in current_transactions if t.get('type') == 'Transfer')
+            totals = TransactionService.totals_by_type(current_transactions)
+            total_income = totals['Income']
+            total_expenses = totals['Expense']
+            total_investments = totals['Investment']
+            total_transfers = totals['Transfer']
             
             net_cash_flow = total_income - total_expenses - total_investments - total_transfers
             
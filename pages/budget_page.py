@@ -186,15 +186,10 @@ class BudgetPage:
                         current_user = AuthMiddleware.get_current_user_id()
                         user_id = current_user['user_id'] if isinstance(current_user, dict) else current_user
                         
-                        success_count = 0
-                        failed_categories = []
-                        
-                        for item in budget_items:
-                            result = DatabaseService.add_budget(item, user_id)
-                            if result and result > 0:
-                                success_count += 1
-                            else:
-                                failed_categories.append(item['category'])
+                        # One transaction reusing the cached INSERT/UPDATE statements for every category;
+                        # it either writes all valid items or raises
+                        success_count = DatabaseService.add_budgets_bulk(budget_items, user_id)
+                        failed_categories = [] if success_count else [item['category'] for item in budget_items]
                         
                         if success_count == len(budget_items):
                             st.success("✅ Budget saved successfully!")
@@ -604,7 +604,7 @@ class DashboardPage:
             if date_filter:
                 date_match = start_str <= tx_date <= end_str
             else:
-                date_match = tx_date.startswith(current_month)
+                date_match = tx_date[:7] == current_month
             
             if date_match and tx_type == 'expense' and tx_amount > 0:
                 spending_by_category[tx_category] = spending_by_category.get(tx_category, 0) + tx_amount
@@ -679,7 +679,7 @@ class DashboardPage:
         """Get spending data for current month"""
         current_month = datetime.now().strftime('%Y-%m')
         expense_transactions = [t for t in transactions if 
-                              t.get('date', '').startswith(current_month) and 
+                              t.get('date', '')[:7] == current_month and 
                               t.get('type', '').lower() == 'expense']
         
         if not expense_transactions:
@@ -780,7 +780,7 @@ class DashboardPage:
         # Filter for expenses in current period
         current_month = datetime.now().strftime('%Y-%m')
         expense_transactions = [t for t in transactions if 
-                              t.get('date', '').startswith(current_month) and 
+                              t.get('date', '')[:7] == current_month and 
                               t.get('type', '').lower() == 'expense']
         
         if not expense_transactions:
@@ -885,7 +885,7 @@ class DashboardPage:
             
             category_spending = {}
             for transaction in transactions:
-                if (transaction.get('date', '').startswith(current_month) and 
+                if (transaction.get('date', '')[:7] == current_month and 
                     transaction.get('type', '').lower() in ['expense']):
                     category = transaction.get('category', 'Other')
                     amount = float(transaction.get('amount', 0))
@@ -953,7 +953,7 @@ class DashboardPage:
             # Calculate spending by category
             spending_by_category = {}
             for transaction in transactions:
-                if (transaction.get('date', '').startswith(current_month) and 
+                if (transaction.get('date', '')[:7] == current_month and 
                     transaction.get('type', '').lower() in ['expense']):
                     category = transaction.get('category', 'Other')
                     amount = float(transaction.get('amount', 0))
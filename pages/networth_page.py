@@ -413,7 +413,7 @@ class NetWorthPage:
             monthly_income = sum(
                 float(t.get('amount', 0)) 
                 for t in transactions 
-                if t.get('date', '').startswith(current_month) and t.get('type', '').lower() == 'income'
+                if t.get('date', '')[:7] == current_month and t.get('type', '').lower() == 'income'
             )
             
             # Calculate debt-to-income ratio (standard financial metric)
@@ -0,0 +1,29 @@
+"""
+Compiled per-type reduction for very large transaction lists
+
+Importing this module imports numpy and numba (ImportError without them), so
+financial_data_service only loads it the first time a list is large enough to vectorize.
+"""
+import numpy as np
+from numba import njit
+
+@njit(cache=True)
+def _sum_by_code(codes, amounts, size):
+    """Sum amounts into ``size`` slots indexed by their int code
+    
+    A serial loop on purpose: under prange every iteration would scatter into the
+    same few slots and race.
+    """
+    out = np.zeros(size)
+    for i in range(codes.size):
+        out[codes[i]] += amounts[i]
+    return out
+
+def sum_by_code(codes, amounts, count: int, size: int) -> list:
+    """Sum ``count`` amounts into ``size`` slots by their code; both arguments are iterables
+    
+    Codes must be in range(size). Returns the per-code sums as Python floats.
+    """
+    code_array = np.fromiter(codes, dtype=np.int8, count=count)
+    amount_array = np.fromiter(amounts, dtype=np.float64, count=count)
+    return _sum_by_code(code_array, amount_array, size).tolist()
@@ -2,32 +2,184 @@ import sqlite3
 import os
 import json
 import logging
-from datetime import datetime
-from typing import List, Dict, Any, Optional
+import logging.handlers
+import queue
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from operator import itemgetter
+from typing import List, Dict, Any, Iterator, Optional, Tuple, Union
 from config.constants import DatabaseConstants
 
-# Configure logging to file and stdout for diagnostics and auditing
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('logs/database.log'),
-        logging.StreamHandler()
-    ]
-)
+# orjson is an optional, faster drop-in for the stdlib encoder. Both helpers
+# produce/accept str so TEXT columns keep their existing format either way.
+try:
+    import orjson
+
+    def _dumps(value: Any) -> str:
+        return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY).decode()
+
+    _loads = orjson.loads
+except ImportError:
+    _dumps = json.dumps
+    _loads = json.loads
+
+# Undo snapshots are stored as MessagePack BLOBs when msgpack is installed, which
+# is faster to encode and smaller than JSON for large bulk-delete payloads.
+# Without it they stay JSON TEXT; _unpack_snapshot reads either format.
+try:
+    import msgpack
+
+    def _snapshot_default(value: Any) -> Any:
+        # numpy scalars and arrays (e.g. ids and amounts from DataFrame rows), which
+        # the orjson path handles via OPT_SERIALIZE_NUMPY
+        if hasattr(value, 'tolist'):
+            return value.tolist()
+        raise TypeError(f"Object of type {type(value).__name__} is not MessagePack serializable")
+
+    def _pack_snapshot(value: Any) -> Union[bytes, str]:
+        return msgpack.packb(value, use_bin_type=True, default=_snapshot_default)
+
+    _SNAPSHOT_DECODE_ERRORS = (ValueError, msgpack.UnpackException)
+except ImportError:
+    msgpack = None
+    _pack_snapshot = _dumps
+    _SNAPSHOT_DECODE_ERRORS = (json.JSONDecodeError,)
+
+def _unpack_snapshot(value: Union[bytes, str]) -> Any:
+    """Decode an undo snapshot payload written by _pack_snapshot or by older JSON TEXT versions"""
+    if msgpack is not None and isinstance(value, bytes):
+        return msgpack.unpackb(value, raw=False)
+    return _loads(value)
+
 logger = logging.getLogger(__name__)
+_logging_configured = False
+
+def _configure_logging_once():
+    """Configure logging to file and stdout for diagnostics and auditing on first database use
+    
+    The rotating file handler is created with delay=True so logs/database.log is only
+    opened when the first record is written, not when this module is imported.
+    """
+    global _logging_configured
+    if _logging_configured:
+        return
+    _logging_configured = True
+    
+    os.makedirs('logs', exist_ok=True)
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.handlers.RotatingFileHandler('logs/database.log', maxBytes=5_000_000, backupCount=3, delay=True),
+            logging.StreamHandler()
+        ]
+    )
+
+# INSERT statements shared by the single-row and bulk write paths. Keeping each
+# statement as one constant keeps SQLite's per-connection statement cache warm.
+_SQL_INSERT_TX = ('INSERT INTO transactions (date, amount, type, description, category, payment_method, additional_data, user_id, statement_metadata_json) '
+                  'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)')
+_SQL_INSERT_ASSET = 'INSERT INTO assets (name, value, owner, asset_type, user_id) VALUES (?, ?, ?, ?, ?)'
+_SQL_INSERT_LIABILITY = 'INSERT INTO liabilities (name, value, owner, liability_type, user_id) VALUES (?, ?, ?, ?, ?)'
+_SQL_INSERT_REAL_ESTATE = 'INSERT INTO real_estate (name, current_value, purchase_value, owner, user_id) VALUES (?, ?, ?, ?, ?)'
+_SQL_INSERT_BUDGET = 'INSERT INTO budget (category, amount, month, year, user_id) VALUES (?, ?, ?, ?, ?)'
+_SQL_INSERT_STATEMENT = 'INSERT OR IGNORE INTO statements (bank_name, account_number, account_type, statement_month, statement_year, processed_date) VALUES (?, ?, ?, ?, ?, ?)'
+_SQL_UPSERT_STATEMENT = ('INSERT INTO statements (bank_name, account_number, account_type, statement_month, statement_year, processed_date) VALUES (?, ?, ?, ?, ?, ?) '
+                         'ON CONFLICT(bank_name, account_number, account_type, statement_month, statement_year) DO UPDATE SET processed_date = excluded.processed_date RETURNING id')
+_SQL_SELECT_STATEMENT_ID = 'SELECT id FROM statements WHERE bank_name = ? AND account_number = ? AND account_type = ? AND statement_month = ? AND statement_year = ?'
+_SQL_UPSERT_PREFERENCE = 'INSERT OR REPLACE INTO user_preferences (key, user_id, value, updated_at) VALUES (?, ?, ?, CURRENT_TIMESTAMP)'
+_SQL_INSERT_AUDIT = 'INSERT INTO audit.audit_log (user_id, action, table_name, record_id, old_data, new_data) VALUES (?, ?, ?, ?, ?, ?)'
+_SQL_INSERT_UNDO = 'INSERT INTO audit.undo_snapshots (user_id, action, data, expires_at) VALUES (?, ?, ?, ?)'
+
+# Runtime reads, updates and deletes, kept with canonical whitespace so every caller
+# of a query binds the same text and reuses the same cached prepared statement
+_SQL_SELECT_TX_BY_USER = 'SELECT * FROM transactions WHERE user_id = ? ORDER BY date DESC'
+_SQL_SELECT_TX_BY_USER_PAGED = _SQL_SELECT_TX_BY_USER + ' LIMIT ? OFFSET ?'
+_SQL_SELECT_TX_BY_USER_SINCE = 'SELECT * FROM transactions WHERE user_id = ? AND date >= ? ORDER BY date DESC'
+_SQL_SELECT_TX_BY_USER_SINCE_PAGED = _SQL_SELECT_TX_BY_USER_SINCE + ' LIMIT ? OFFSET ?'
+_SQL_SELECT_TX_LATEST_STATEMENT_METADATA = ('SELECT statement_metadata_json FROM transactions WHERE user_id = ? '
+                                            'AND statement_metadata_json IS NOT NULL ORDER BY date DESC LIMIT 1')
+_SQL_SELECT_TX_TYPE_TOTALS = 'SELECT type, SUM(CAST(amount AS REAL)) AS total, COUNT(*) AS count FROM transactions WHERE user_id = ?'
+_SQL_SELECT_TX = 'SELECT * FROM transactions WHERE id = ? AND user_id = ?'
+_SQL_SELECT_TX_OWNER = 'SELECT user_id FROM transactions WHERE id = ?'
+_SQL_DELETE_TX = 'DELETE FROM transactions WHERE id = ? AND user_id = ?'
+_SQL_DELETE_TX_BY_MONTH = 'DELETE FROM transactions WHERE date LIKE ? AND user_id = ?'
+_SQL_SELECT_ASSETS = 'SELECT * FROM assets WHERE user_id = ?'
+_SQL_SELECT_ASSETS_BY_TYPE = 'SELECT * FROM assets WHERE user_id = ? AND asset_type = ?'
+_SQL_UPDATE_ASSET = 'UPDATE assets SET value = ?, updated_at = ? WHERE id = ?'
+_SQL_SELECT_LIABILITIES = 'SELECT * FROM liabilities WHERE user_id = ?'
+_SQL_SELECT_LIABILITIES_BY_TYPE = 'SELECT * FROM liabilities WHERE user_id = ? AND liability_type = ?'
+_SQL_SELECT_REAL_ESTATE = 'SELECT * FROM real_estate WHERE user_id = ?'
+_SQL_SELECT_BUDGET_ID = 'SELECT id FROM budget WHERE category = ? AND month = ? AND year = ? AND user_id = ?'
+_SQL_UPDATE_BUDGET_AMOUNT = 'UPDATE budget SET amount = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?'
+_SQL_SELECT_BUDGET_BY_MONTH = 'SELECT * FROM budget WHERE month = ? AND year = ? AND user_id = ?'
+_SQL_SELECT_BUDGET_BY_YEAR = 'SELECT * FROM budget WHERE year = ? AND user_id = ?'
+_SQL_SELECT_STATEMENTS = 'SELECT * FROM statements'
+_SQL_SELECT_PREFERENCE = 'SELECT value FROM user_preferences WHERE key = ? AND user_id = ?'
+_SQL_SELECT_AUDIT_LOG = 'SELECT * FROM audit.audit_log WHERE user_id = ? ORDER BY timestamp DESC LIMIT ?'
+_SQL_SELECT_UNDO_BY_USER = 'SELECT * FROM audit.undo_snapshots WHERE user_id = ? AND expires_at >= ? ORDER BY created_at DESC'
+_SQL_SELECT_UNDO = 'SELECT * FROM audit.undo_snapshots WHERE id = ? AND user_id = ?'
+_SQL_DELETE_UNDO = 'DELETE FROM audit.undo_snapshots WHERE id = ?'
+_SQL_TAKE_UNDO = 'DELETE FROM audit.undo_snapshots WHERE id = ? AND user_id = ? RETURNING action, data'
+_SQL_DELETE_EXPIRED_UNDO = 'DELETE FROM audit.undo_snapshots WHERE expires_at < ?'
+
+# INSERT ... RETURNING (SQLite 3.35+) hands back the stored row without a follow-up SELECT
+_HAS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+
+class _PooledConnection(sqlite3.Connection):
+    """sqlite3 connection that remembers which database files it was opened for"""
+    pool_key: Optional[Tuple[str, str]] = None
+
+# Column defaults and getters that turn an input dict into the parameter tuple of
+# the matching INSERT in one step: merge defaults once, then fetch every column.
+_STANDARD_TX_FIELDS = frozenset({'date', 'amount', 'type', 'description', 'category', 'payment_method'})
+_TX_DEFAULTS = {'description': '', 'category': 'Other', 'payment_method': 'Other'}
+_TX_GET = itemgetter('date', 'amount', 'type', 'description', 'category', 'payment_method')
+_ASSET_DEFAULTS = {'name': None, 'value': None, 'owner': 'Joint', 'asset_type': 'Other'}
+_ASSET_GET = itemgetter('name', 'value', 'owner', 'asset_type', 'user_id')
+_LIABILITY_DEFAULTS = {'name': None, 'value': None, 'owner': 'Joint', 'liability_type': 'Other'}
+_LIABILITY_GET = itemgetter('name', 'value', 'owner', 'liability_type', 'user_id')
+_REAL_ESTATE_DEFAULTS = {'name': None, 'current_value': None, 'purchase_value': 0, 'owner': 'Joint'}
+_REAL_ESTATE_GET = itemgetter('name', 'current_value', 'purchase_value', 'owner', 'user_id')
 
 class DatabaseService:
     """Service for handling database operations"""
     
     DB_FILE = DatabaseConstants.DB_FILE
+    AUDIT_DB_FILE = DatabaseConstants.AUDIT_DB_FILE
+    MAX_SQL_VARIABLES = 999  # Lowest bound-parameter limit across supported SQLite versions
+    CACHED_STATEMENTS = 256  # Per-connection prepared statement cache size
+    FETCH_BATCH_SIZE = 1000  # Rows pulled per fetchmany() when streaming results
+    POOL_SIZE = 8  # Idle connections kept open for reuse
+    UNDO_CLEANUP_INTERVAL = 3600  # Seconds between expired undo snapshot purges
+    UNDO_SNAPSHOT_TTL = timedelta(hours=24)  # How long a snapshot can be restored
     
+    _pool: Optional[queue.Queue] = None
+    _pool_key: Optional[Tuple[str, str]] = None
+    _pool_lock = threading.Lock()
+    _write_lock = threading.RLock()
+    _undo_cleanup_timer: Optional[threading.Timer] = None
+
     @classmethod
     def get_connection(cls):
         """Get a database connection"""
+        _configure_logging_once()
         try:
-            conn = sqlite3.connect(cls.DB_FILE)
+            # Allow pooled connections to be shared across Streamlit's script threads and
+            # keep a larger compiled-statement cache for the hot INSERT/SELECT paths
+            conn = sqlite3.connect(cls.DB_FILE, cached_statements=cls.CACHED_STATEMENTS, check_same_thread=False, factory=_PooledConnection)
             conn.row_factory = sqlite3.Row  # Return rows as dictionaries
+            # WAL lets readers run alongside the writer; NORMAL sync is durable in WAL mode
+            # and the larger page cache survives between calls on pooled connections
+            conn.execute('PRAGMA journal_mode = WAL')
+            conn.execute('PRAGMA synchronous = NORMAL')
+            conn.execute('PRAGMA temp_store = MEMORY')
+            conn.execute('PRAGMA cache_size = -64000')
+            # Audit log and undo snapshots live in their own file so their writes and
+            # fsyncs go to a separate journal instead of the main database's WAL
+            conn.execute('ATTACH DATABASE ? AS audit', (cls.AUDIT_DB_FILE,))
+            conn.execute('PRAGMA audit.synchronous = NORMAL')
             return conn
         except sqlite3.OperationalError as e:
             # Catch OperationalError for database file permission issues
@@ -41,6 +193,108 @@ class DatabaseService:
             logger.error(f"Unexpected database connection error: {str(e)}")
             raise ConnectionError(f"Failed to connect to database: {str(e)}")
     
+    @classmethod
+    def _acquire(cls) -> sqlite3.Connection:
+        """Take an idle pooled connection, opening a new one when none is available"""
+        key = (cls.DB_FILE, cls.AUDIT_DB_FILE)
+        with cls._pool_lock:
+            if cls._pool_key != key:
+                cls._drain_pool()
+                cls._pool = queue.Queue(maxsize=cls.POOL_SIZE)
+                cls._pool_key = key
+            pool = cls._pool
+        
+        try:
+            return pool.get_nowait()
+        except queue.Empty:
+            conn = cls.get_connection()
+            conn.pool_key = key
+            return conn
+    
+    @classmethod
+    def _release(cls, conn: sqlite3.Connection):
+        """Return a connection to the pool, closing it if the pool is full or stale"""
+        if conn.in_transaction:
+            conn.rollback()
+        
+        with cls._pool_lock:
+            pool = cls._pool if cls._pool_key == conn.pool_key else None
+        try:
+            if pool is None:
+                raise queue.Full
+            pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+    
+    @classmethod
+    @contextmanager
+    def _borrow(cls):
+        """Borrow a pooled connection for the duration of the block"""
+        conn = cls._acquire()
+        try:
+            yield conn
+        finally:
+            cls._release(conn)
+    
+    @classmethod
+    def _drain_pool(cls):
+        """Close every idle pooled connection (caller holds _pool_lock)"""
+        if cls._pool is None:
+            return
+        while True:
+            try:
+                cls._pool.get_nowait().close()
+            except queue.Empty:
+                break
+    
+    @classmethod
+    def close_pool(cls):
+        """Close idle pooled connections, e.g. before switching or removing the database file"""
+        with cls._pool_lock:
+            cls._drain_pool()
+            cls._pool = None
+            cls._pool_key = None
+    
+    @classmethod
+    @contextmanager
+    def transaction(cls):
+        """Group several writes into one transaction so they commit (and fsync) once
+        
+        Pass the yielded connection to the write methods via their ``conn`` argument:
+            
+            with DatabaseService.transaction() as conn:
+                DatabaseService.add_asset(asset, user_id, conn=conn)
+                DatabaseService.add_liability(liability, user_id, conn=conn)
+        """
+        with cls._write_lock, cls._borrow() as conn:
+            try:
+                conn.execute('BEGIN IMMEDIATE')
+                yield conn
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+    
+    @classmethod
+    @contextmanager
+    def _use_connection(cls, conn: Optional[sqlite3.Connection] = None):
+        """Yield the caller's connection as-is, or a pooled one that is committed on exit
+        
+        Pooled writes are serialized through _write_lock so in-process writers queue up
+        instead of racing for SQLite's write lock and failing with SQLITE_BUSY.
+        """
+        if conn is not None:
+            yield conn
+            return
+        
+        with cls._write_lock, cls._borrow() as conn:
+            try:
+                yield conn
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+    
     @classmethod
     def initialize_database(cls):
         """Create database tables if they don't exist"""
@@ -67,7 +321,9 @@ class DatabaseService:
                 category TEXT,
                 payment_method TEXT,
                 additional_data TEXT,  -- JSON field for dynamic attributes
-                created_at TEXT DEFAULT CURRENT_TIMESTAMP
+                created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+                user_id TEXT,
+                statement_metadata_json TEXT  -- Copy of additional_data.statement_metadata for direct reads
             )
             ''')
             
@@ -80,7 +336,8 @@ class DatabaseService:
                 owner TEXT NOT NULL,
                 asset_type TEXT NOT NULL,
                 created_at TEXT DEFAULT CURRENT_TIMESTAMP,
-                updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+                updated_at TEXT DEFAULT CURRENT_TIMESTAMP,
+                user_id TEXT
             )
             ''')
             
@@ -93,7 +350,8 @@ class DatabaseService:
                 owner TEXT NOT NULL,
                 liability_type TEXT NOT NULL,
                 created_at TEXT DEFAULT CURRENT_TIMESTAMP,
-                updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+                updated_at TEXT DEFAULT CURRENT_TIMESTAMP,
+                user_id TEXT
             )
             ''')
             
@@ -106,7 +364,8 @@ class DatabaseService:
                 purchase_value REAL NOT NULL,
                 owner TEXT NOT NULL,
                 created_at TEXT DEFAULT CURRENT_TIMESTAMP,
-                updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+                updated_at TEXT DEFAULT CURRENT_TIMESTAMP,
+                user_id TEXT
             )
             ''')
             
@@ -140,14 +399,24 @@ class DatabaseService:
             )
             ''')
             
-            # Create indexes for performance optimization (user_id columns added dynamically)
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_transactions_date ON transactions(date DESC)')
+            # Create indexes matching the per-user query shapes (user_id filter first, then sort/filter key)
+            cursor.execute('DROP INDEX IF EXISTS idx_transactions_date')
+            # type and amount ride along so the per-type summary is answered from the index alone
+            cursor.execute('DROP INDEX IF EXISTS idx_tx_user_date')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_tx_user_date_type ON transactions(user_id, date, type, amount)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_assets_user_type ON assets(user_id, asset_type)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_liab_user_type ON liabilities(user_id, liability_type)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_re_user ON real_estate(user_id)')
             cursor.execute('CREATE INDEX IF NOT EXISTS idx_transactions_type ON transactions(type)')
             cursor.execute('CREATE INDEX IF NOT EXISTS idx_transactions_category ON transactions(category)')
+            # Partial index: only rows carrying statement metadata, so the newest one is a single seek
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_tx_user_statement_metadata ON transactions(user_id, date) '
+                           'WHERE statement_metadata_json IS NOT NULL')
             
-            # Create audit log table for sensitive actions
+            # Create audit log table for sensitive actions in the attached audit database
+            cursor.execute('PRAGMA audit.journal_mode = WAL')
             cursor.execute('''
-            CREATE TABLE IF NOT EXISTS audit_log (
+            CREATE TABLE IF NOT EXISTS audit.audit_log (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 user_id TEXT NOT NULL,
                 action TEXT NOT NULL,
@@ -158,20 +427,54 @@ class DatabaseService:
                 timestamp TEXT DEFAULT CURRENT_TIMESTAMP
             )
             ''')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_audit_user_timestamp ON audit_log(user_id, timestamp DESC)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS audit.idx_audit_user_timestamp ON audit_log(user_id, timestamp DESC)')
             
             # Create undo snapshots table
             cursor.execute('''
-            CREATE TABLE IF NOT EXISTS undo_snapshots (
+            CREATE TABLE IF NOT EXISTS audit.undo_snapshots (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 user_id TEXT NOT NULL,
                 action TEXT NOT NULL,
-                data TEXT NOT NULL,
+                data BLOB NOT NULL,
                 created_at TEXT DEFAULT CURRENT_TIMESTAMP,
                 expires_at TEXT NOT NULL
             )
             ''')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_undo_user_created ON undo_snapshots(user_id, created_at DESC)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS audit.idx_undo_user_created ON undo_snapshots(user_id, created_at DESC)')
+            # Lets the expired-snapshot cleanup range-scan instead of walking the table
+            cursor.execute('CREATE INDEX IF NOT EXISTS audit.idx_undo_expires ON undo_snapshots(expires_at)')
+            
+            # Move rows from audit tables created in the main database by older versions
+            for table in ('audit_log', 'undo_snapshots'):
+                cursor.execute("SELECT 1 FROM main.sqlite_master WHERE type = 'table' AND name = ?", (table,))
+                if cursor.fetchone():
+                    cursor.execute(f'INSERT INTO audit.{table} SELECT * FROM main.{table}')
+                    cursor.execute(f'DROP TABLE main.{table}')
+            
+            # Re-encode undo snapshots stored as JSON TEXT by older versions
+            if msgpack is not None:
+                cursor.execute("SELECT id, data FROM audit.undo_snapshots WHERE typeof(data) = 'text'")
+                legacy = []
+                for snapshot_id, data in cursor.fetchall():
+                    try:
+                        legacy.append((_pack_snapshot(_loads(data)), snapshot_id))
+                    except _SNAPSHOT_DECODE_ERRORS:
+                        # Left as-is; restore_from_undo reports it as corrupted
+                        continue
+                if legacy:
+                    cursor.executemany('UPDATE audit.undo_snapshots SET data = ? WHERE id = ?', legacy)
+            
+            # Create user preferences table
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS user_preferences (
+                key TEXT NOT NULL,
+                user_id TEXT NOT NULL,
+                value TEXT NOT NULL,
+                updated_at TEXT DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (key, user_id)
+            )
+            ''')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_prefs_user ON user_preferences(user_id)')
             
             conn.commit()
         except sqlite3.OperationalError as e:
@@ -192,6 +495,10 @@ class DatabaseService:
         finally:
             if conn:
                 conn.close()
+        
+        # Drop expired undo snapshots now and then periodically, off the read path
+        cls.purge_expired_undo_snapshots()
+        cls._schedule_undo_cleanup()
     
     @classmethod
     def import_json_data(cls):
@@ -202,621 +509,783 @@ class DatabaseService:
 
     # Transaction methods
     @classmethod
-    def add_transaction(cls, transaction: Dict[str, Any], user_id: str) -> int:
-        """Add a transaction to the database with user isolation"""
-        conn = None
+    def add_transaction(cls, transaction: Dict[str, Any], user_id: str, return_row: bool = False) -> Union[int, Dict[str, Any]]:
+        """Add a transaction to the database with user isolation
+        
+        Returns the new id, or the full stored row when ``return_row`` is set.
+        """
         try:
             # Validate required fields
-            if 'date' not in transaction:
-                raise ValueError("Transaction date is required")
-            if 'amount' not in transaction:
-                raise ValueError("Transaction amount is required")
-            if 'type' not in transaction:
-                raise ValueError("Transaction type is required")
+            cls._validate_transaction(transaction)
             if not user_id:
                 raise ValueError("User ID is required")
                 
-            conn = cls.get_connection()
-            cursor = conn.cursor()
-            
-            # Add user_id column if it doesn't exist
-            cursor.execute("PRAGMA table_info(transactions)")
-            columns = [column[1] for column in cursor.fetchall()]
-            if 'user_id' not in columns:
-                cursor.execute('ALTER TABLE transactions ADD COLUMN user_id TEXT')
-            
-            # Extract standard fields
-            date = transaction.get('date')
-            amount = transaction.get('amount')
-            type_ = transaction.get('type')
-            description = transaction.get('description', '')
-            category = transaction.get('category', 'Other')
-            payment_method = transaction.get('payment_method', 'Other')
-            
-            # Extract additional data (anything that's not a standard field)
-            standard_fields = {'date', 'amount', 'type', 'description', 'category', 'payment_method'}
-            additional_data = {k: v for k, v in transaction.items() if k not in standard_fields}
-            
-            # Convert additional data to JSON string
-            additional_data_json = json.dumps(additional_data) if additional_data else None
-            
-            cursor.execute('''
-            INSERT INTO transactions (date, amount, type, description, category, payment_method, additional_data, user_id)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                date,
-                amount,
-                type_,
-                description,
-                category,
-                payment_method,
-                additional_data_json,
-                user_id
-            ))
-            
-            transaction_id = cursor.lastrowid
-            conn.commit()
-            return transaction_id
+            with cls._use_connection() as conn:
+                cursor = conn.cursor()
+                
+                # Add user_id column if it doesn't exist
+                cursor.execute("PRAGMA table_info(transactions)")
+                columns = [column[1] for column in cursor.fetchall()]
+                if 'user_id' not in columns:
+                    cursor.execute('ALTER TABLE transactions ADD COLUMN user_id TEXT')
+                
+                return cls._execute_insert(cursor, _SQL_INSERT_TX, cls._transaction_row(transaction, user_id), 'transactions', return_row)
         except sqlite3.IntegrityError as e:
             # Handle constraint violations (duplicate keys, foreign key errors)
-            if conn:
-                conn.rollback()
             logger.warning(f"Transaction data integrity violation: {str(e)}")
             raise ValueError(f"Invalid transaction data: {str(e)}")
         except sqlite3.OperationalError as e:
             # Catch OperationalError for database file permission issues
-            if conn:
-                conn.rollback()
             logger.error(f"Database operation failed for transaction: {str(e)}")
             raise IOError(f"Database operation failed. Try again: {str(e)}")
         except ValueError as e:
             logger.warning(f"Transaction validation failed: {str(e)}")
             raise
-        except json.JSONEncodeError as e:
-            if conn:
-                conn.rollback()
+        except TypeError as e:
             logger.error(f"Failed to serialize transaction data: {str(e)}")
             raise ValueError(f"Invalid transaction data format: {str(e)}")
         except Exception as e:
-            if conn:
-                conn.rollback()
             logger.error(f"Unexpected error adding transaction: {str(e)}")
             raise RuntimeError(f"Failed to save transaction: {str(e)}")
-        finally:
-            if conn:
-                conn.close()
+    
+    @staticmethod
+    def _fetch_dicts(cursor: sqlite3.Cursor) -> List[Dict[str, Any]]:
+        """Fetch all remaining rows as dicts, reading the column names once per query"""
+        columns = [description[0] for description in cursor.description]
+        # Plain tuples for this cursor only; building each sqlite3.Row just to zip it is wasted work
+        cursor.row_factory = None
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+    
+    @staticmethod
+    def _execute_insert(cursor: sqlite3.Cursor, sql: str, params: Tuple, table: str, return_row: bool) -> Union[int, Dict[str, Any]]:
+        """Run an INSERT and return the new id, or the inserted row when requested"""
+        if not return_row:
+            cursor.execute(sql, params)
+            return cursor.lastrowid
+        
+        if _HAS_RETURNING:
+            cursor.execute(f'{sql} RETURNING *', params)
+            return dict(cursor.fetchone())
+        
+        cursor.execute(sql, params)
+        cursor.execute(f'SELECT * FROM {table} WHERE id = ?', (cursor.lastrowid,))
+        return dict(cursor.fetchone())
     
     @classmethod
-    def get_transactions(cls, user_id: str = None) -> List[Dict[str, Any]]:
-        """Get transactions from the database, filtered by user if provided"""
-        conn = cls.get_connection()
-        cursor = conn.cursor()
+    def add_transactions_bulk(cls, transactions: List[Dict[str, Any]], user_id: str) -> int:
+        """Add many transactions in a single database transaction with user isolation"""
+        try:
+            if not user_id:
+                raise ValueError("User ID is required")
+            for transaction in transactions:
+                cls._validate_transaction(transaction)
+            
+            # Serialize every row before touching the database so the write lock is held briefly
+            rows = [cls._transaction_row(transaction, user_id) for transaction in transactions]
+            if not rows:
+                return 0
+            
+            # One BEGIN/COMMIT for the whole batch instead of one commit per row
+            with cls._use_connection() as conn:
+                cursor = conn.cursor()
+                
+                # Add user_id column if it doesn't exist
+                cursor.execute("PRAGMA table_info(transactions)")
+                columns = [column[1] for column in cursor.fetchall()]
+                if 'user_id' not in columns:
+                    cursor.execute('ALTER TABLE transactions ADD COLUMN user_id TEXT')
+                cursor.executemany(_SQL_INSERT_TX, rows)
+            
+            # Refresh planner statistics after a large load so the user/date index keeps
+            # being chosen; done once the write lock is released so other writers aren't held up
+            with cls._borrow() as conn:
+                conn.execute('PRAGMA optimize')
+            return len(rows)
+        except sqlite3.IntegrityError as e:
+            logger.warning(f"Transaction data integrity violation in bulk insert: {str(e)}")
+            raise ValueError(f"Invalid transaction data: {str(e)}")
+        except sqlite3.OperationalError as e:
+            logger.error(f"Database operation failed for bulk transaction insert: {str(e)}")
+            raise IOError(f"Database operation failed. Try again: {str(e)}")
+        except ValueError as e:
+            logger.warning(f"Transaction validation failed: {str(e)}")
+            raise
+        except TypeError as e:
+            logger.error(f"Failed to serialize transaction data: {str(e)}")
+            raise ValueError(f"Invalid transaction data format: {str(e)}")
+        except Exception as e:
+            logger.error(f"Unexpected error adding transactions: {str(e)}")
+            raise RuntimeError(f"Failed to save transactions: {str(e)}")
+    
+    @staticmethod
+    def _validate_transaction(transaction: Dict[str, Any]):
+        """Ensure a transaction carries the fields required by the schema"""
+        if 'date' not in transaction:
+            raise ValueError("Transaction date is required")
+        if 'amount' not in transaction:
+            raise ValueError("Transaction amount is required")
+        if 'type' not in transaction:
+            raise ValueError("Transaction type is required")
+    
+    @staticmethod
+    def _transaction_row(transaction: Dict[str, Any], user_id: str) -> tuple:
+        """Build the parameter tuple for _SQL_INSERT_TX from a transaction dict"""
+        # Extract additional data (anything that's not a standard field); the set
+        # difference skips the per-key scan for the common all-standard row
+        additional_keys = transaction.keys() - _STANDARD_TX_FIELDS
+        additional_data = {k: v for k, v in transaction.items() if k in additional_keys} if additional_keys else None
         
-        # Add user_id column if it doesn't exist
-        cursor.execute("PRAGMA table_info(transactions)")
-        columns = [column[1] for column in cursor.fetchall()]
-        if 'user_id' not in columns:
-            cursor.execute('ALTER TABLE transactions ADD COLUMN user_id TEXT')
-            # Set existing transactions to default user for migration
-            cursor.execute('UPDATE transactions SET user_id = ? WHERE user_id IS NULL', ('default_user',))
-            conn.commit()
+        statement_metadata = transaction.get('statement_metadata')
         
-        if user_id:
-            # Handle both string and integer user_id
-            cursor.execute('SELECT * FROM transactions WHERE user_id = ? ORDER BY date DESC', (str(user_id),))
-        else:
+        return (
+            *_TX_GET({**_TX_DEFAULTS, **transaction}),
+            # Convert additional data to JSON string
+            _dumps(additional_data) if additional_data else None,
+            user_id,
+            # Stored on its own too, so statement metadata reads never parse additional_data
+            _dumps(statement_metadata) if statement_metadata else None
+        )
+    
+    @classmethod
+    def get_transactions(cls, user_id: str = None, limit: Optional[int] = None, offset: Optional[int] = None, raw: bool = False, since: Optional[str] = None) -> List[Union[Dict[str, Any], sqlite3.Row]]:
+        """Get transactions from the database, filtered by user if provided
+        
+        With ``raw=True`` the sqlite3.Row objects are returned as-is instead of being copied
+        into dicts; they support ``row['date']`` lookups and ``dict(row)`` when needed.
+        ``since`` keeps only dates at or after that ISO date (or 'YYYY-MM' prefix).
+        """
+        return list(cls.iter_transactions(user_id, limit=limit, offset=offset, raw=raw, since=since))
+    
+    @classmethod
+    def iter_transactions(cls, user_id: str = None, limit: Optional[int] = None, offset: Optional[int] = None, raw: bool = False, since: Optional[str] = None) -> Iterator[Union[Dict[str, Any], sqlite3.Row]]:
+        """Stream a user's transactions newest first without materializing the full history
+        
+        ``since`` bounds the date range in SQL (served by idx_tx_user_date_type), so callers
+        that only need a recent window never read older rows.
+        """
+        if not user_id:
             # Don't return any transactions if no user_id provided
-            return []
+            return
+        
+        conn = cls._acquire()
+        try:
+            cursor = conn.cursor()
             
-        transactions = [dict(row) for row in cursor.fetchall()]
+            # Add user_id column if it doesn't exist
+            cursor.execute("PRAGMA table_info(transactions)")
+            columns = [column[1] for column in cursor.fetchall()]
+            if 'user_id' not in columns:
+                cursor.execute('ALTER TABLE transactions ADD COLUMN user_id TEXT')
+                # Set existing transactions to default user for migration
+                cursor.execute('UPDATE transactions SET user_id = ? WHERE user_id IS NULL', ('default_user',))
+                conn.commit()
+            
+            # Handle both string and integer user_id
+            params = (str(user_id),) if since is None else (str(user_id), since)
+            if limit is not None or offset is not None:
+                # SQLite needs a LIMIT clause for OFFSET; -1 means no limit
+                sql = _SQL_SELECT_TX_BY_USER_PAGED if since is None else _SQL_SELECT_TX_BY_USER_SINCE_PAGED
+                cursor.execute(sql, (*params, limit if limit is not None else -1, offset or 0))
+            else:
+                cursor.execute(_SQL_SELECT_TX_BY_USER if since is None else _SQL_SELECT_TX_BY_USER_SINCE, params)
+            
+            if not raw:
+                # Dicts are zipped straight from plain tuples, skipping the sqlite3.Row wrapper
+                columns = [description[0] for description in cursor.description]
+                cursor.row_factory = None
+            
+            while True:
+                rows = cursor.fetchmany(cls.FETCH_BATCH_SIZE)
+                if not rows:
+                    break
+                if raw:
+                    yield from rows
+                else:
+                    for row in rows:
+                        yield dict(zip(columns, row))
+        finally:
+            cls._release(conn)
+    
+    @classmethod
+    def get_transaction_type_totals(cls, user_id: str, start_date: Optional[str] = None, end_date: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        """Sum a user's transaction amounts per type in SQL
+        
+        Args:
+            user_id: The user identifier
+            start_date: Optional inclusive lower bound on the date string
+            end_date: Optional exclusive upper bound on the date string
+            
+        Returns:
+            {type: {'total': float, 'count': int}} for each type present
+        """
+        if not user_id:
+            return {}
+        
+        # Fixed fragments only; the bounds are bound parameters so the covering idx_tx_user_date_type serves the range
+        sql, params = _SQL_SELECT_TX_TYPE_TOTALS, [str(user_id)]
+        if start_date is not None:
+            sql += ' AND date >= ?'
+            params.append(start_date)
+        if end_date is not None:
+            sql += ' AND date < ?'
+            params.append(end_date)
         
-        conn.close()
-        return transactions
+        with cls._borrow() as conn:
+            rows = conn.execute(sql + ' GROUP BY type', params).fetchall()
+        return {row['type']: {'total': row['total'] or 0.0, 'count': row['count']} for row in rows}
     
     @classmethod
-    def delete_transaction(cls, transaction_id: int, user_id: str) -> bool:
-        """Delete a transaction from the database with audit logging"""
-        conn = cls.get_connection()
-        cursor = conn.cursor()
+    def get_latest_statement_metadata(cls, user_id: str) -> Optional[Dict[str, Any]]:
+        """Return the statement metadata of the user's newest transaction that carries any
+        
+        Reads the dedicated statement_metadata_json column, so only one small JSON
+        value is fetched and parsed.
+        """
+        if not user_id:
+            return None
+        
+        with cls._borrow() as conn:
+            row = conn.execute(_SQL_SELECT_TX_LATEST_STATEMENT_METADATA, (str(user_id),)).fetchone()
         
+        if row is None:
+            return None
+        try:
+            return _loads(row[0])
+        except json.JSONDecodeError as e:
+            logger.warning(f"Corrupted statement metadata for user {user_id}: {str(e)}")
+            return None
+    
+    @classmethod
+    def delete_transaction(cls, transaction_id: int, user_id: str, conn: Optional[sqlite3.Connection] = None) -> bool:
+        """Delete a transaction from the database with audit logging"""
         # Debug logging
-        logger.info(f"Attempting to delete transaction {transaction_id} for user_id: {user_id} (type: {type(user_id)})")
-        
-        # Get transaction data before deletion for audit log
-        cursor.execute('SELECT * FROM transactions WHERE id = ? AND user_id = ?', (transaction_id, str(user_id)))
-        transaction_data = cursor.fetchone()
-        
-        # Debug: Check if transaction was found
-        if not transaction_data:
-            logger.warning(f"Transaction {transaction_id} not found for user {user_id}")
-            # Try to find the transaction without user filter to see if it exists
-            cursor.execute('SELECT * FROM transactions WHERE id = ?', (transaction_id,))
-            any_transaction = cursor.fetchone()
-            if any_transaction:
-                logger.warning(f"Transaction {transaction_id} exists but belongs to user_id: {any_transaction['user_id']} (type: {type(any_transaction['user_id'])})")
-            else:
-                logger.warning(f"Transaction {transaction_id} does not exist at all")
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(f"Attempting to delete transaction {transaction_id} for user_id: {user_id} (type: {type(user_id)})")
         
-        if transaction_data:
-            # Log the deletion
-            cls._log_audit_action(user_id, 'DELETE', 'transactions', transaction_id, dict(transaction_data), None)
+        uid = str(user_id)
+        with cls._use_connection(conn) as conn:
+            cursor = conn.cursor()
             
-            cursor.execute('DELETE FROM transactions WHERE id = ? AND user_id = ?', (transaction_id, str(user_id)))
-            deleted = cursor.rowcount > 0
-            logger.info(f"Delete operation result: {deleted}")
-        else:
-            deleted = False
-        
-        conn.commit()
-        conn.close()
+            # Get transaction data before deletion for audit log
+            cursor.execute(_SQL_SELECT_TX, (transaction_id, uid))
+            transaction_data = cursor.fetchone()
+            
+            if not transaction_data:
+                logger.warning(f"Transaction {transaction_id} not found for user {user_id}")
+                # Only pay for the ownership lookup when someone is actually debugging
+                if logger.isEnabledFor(logging.DEBUG):
+                    cursor.execute(_SQL_SELECT_TX_OWNER, (transaction_id,))
+                    any_transaction = cursor.fetchone()
+                    if any_transaction:
+                        logger.debug(f"Transaction {transaction_id} exists but belongs to user_id: {any_transaction['user_id']} (type: {type(any_transaction['user_id'])})")
+                    else:
+                        logger.debug(f"Transaction {transaction_id} does not exist at all")
+            
+            if transaction_data:
+                # Log the deletion on the same connection so it commits together with the delete
+                cls._log_audit_action(uid, 'DELETE', 'transactions', transaction_id, dict(transaction_data), None, conn=conn)
+                
+                cursor.execute(_SQL_DELETE_TX, (transaction_id, uid))
+                deleted = cursor.rowcount > 0
+                if logger.isEnabledFor(logging.INFO):
+                    logger.info(f"Delete operation result: {deleted}")
+            else:
+                deleted = False
         
         return deleted
     
     @classmethod
     def bulk_delete_transactions(cls, transaction_ids: List[int], user_id: str) -> int:
         """Delete multiple transactions with audit logging"""
-        conn = cls.get_connection()
-        cursor = conn.cursor()
+        if not transaction_ids:
+            return 0
+
+        uid = str(user_id)
         deleted_count = 0
-        
-        try:
-            for transaction_id in transaction_ids:
-                # Get transaction data before deletion
-                cursor.execute('SELECT * FROM transactions WHERE id = ? AND user_id = ?', (transaction_id, str(user_id)))
-                transaction_data = cursor.fetchone()
-                
-                if transaction_data:
-                    # Log the deletion
-                    cls._log_audit_action(user_id, 'DELETE', 'transactions', transaction_id, dict(transaction_data), None)
-                    
-                    cursor.execute('DELETE FROM transactions WHERE id = ? AND user_id = ?', (transaction_id, str(user_id)))
-                    if cursor.rowcount > 0:
-                        deleted_count += 1
+
+        # Split ids into batches that fit within SQLite's bound-parameter limit
+        batch_size = cls.MAX_SQL_VARIABLES - 1
+        batches = [transaction_ids[i:i + batch_size] for i in range(0, len(transaction_ids), batch_size)]
+
+        # Snapshot, audit and delete in one transaction so the audit log never records
+        # deletions that were rolled back
+        with cls._use_connection() as conn:
+            cursor = conn.cursor()
             
-            conn.commit()
-        except Exception as e:
-            conn.rollback()
-            raise e
-        finally:
-            conn.close()
-        
+            # Get transaction data before deletion with one query per batch
+            audit_entries = []
+            for batch in batches:
+                placeholders = ','.join('?' * len(batch))
+                cursor.execute(f'SELECT * FROM transactions WHERE id IN ({placeholders}) AND user_id = ?', (*batch, uid))
+                audit_entries.extend(
+                    (uid, 'DELETE', 'transactions', transaction_data['id'], dict(transaction_data), None)
+                    for transaction_data in cursor.fetchall()
+                )
+            
+            # Log all deletions at once on the same connection
+            cls._log_audit_actions_bulk(audit_entries, conn=conn)
+
+            for batch in batches:
+                placeholders = ','.join('?' * len(batch))
+                cursor.execute(f'DELETE FROM transactions WHERE id IN ({placeholders}) AND user_id = ?', (*batch, uid))
+                deleted_count += cursor.rowcount
+
         return deleted_count
     
     @classmethod
     def delete_transactions_by_month(cls, month_prefix: str, user_id: str) -> int:
         """Delete all transactions for a specific month (e.g., '2025-01')"""
-        conn = cls.get_connection()
-        cursor = conn.cursor()
-        
-        try:
-            cursor.execute('DELETE FROM transactions WHERE date LIKE ? AND user_id = ?', (f'{month_prefix}%', str(user_id)))
-            deleted_count = cursor.rowcount
-            conn.commit()
-            return deleted_count
-        except Exception as e:
-            conn.rollback()
-            raise e
-        finally:
-            conn.close()
+        with cls._use_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(_SQL_DELETE_TX_BY_MONTH, (f'{month_prefix}%', str(user_id)))
+            return cursor.rowcount
     
     # Asset methods
     @classmethod
-    def add_asset(cls, asset: Dict[str, Any], user_id: str) -> int:
-        """Add an asset to the database with user isolation"""
-        conn = cls.get_connection()
-        cursor = conn.cursor()
-        
-        # Add user_id column if it doesn't exist
-        cursor.execute("PRAGMA table_info(assets)")
-        columns = [column[1] for column in cursor.fetchall()]
-        if 'user_id' not in columns:
-            cursor.execute('ALTER TABLE assets ADD COLUMN user_id TEXT')
+    def add_asset(cls, asset: Dict[str, Any], user_id: str, conn: Optional[sqlite3.Connection] = None, return_row: bool = False,
+                  asset_type: Optional[str] = None) -> Union[int, Dict[str, Any]]:
+        """Add an asset to the database with user isolation
         
-        cursor.execute('''
-        INSERT INTO assets (name, value, owner, asset_type, user_id)
-        VALUES (?, ?, ?, ?, ?)
-        ''', (
-            asset.get('name'),
-            asset.get('value'),
-            asset.get('owner', 'Joint'),
-            asset.get('asset_type', 'Other'),
-            str(user_id)
-        ))
-        
-        asset_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
+        ``asset_type``, when given, overrides the dict's own value without the caller
+        having to write it into ``asset``.
+        """
+        with cls._use_connection(conn) as conn:
+            cursor = conn.cursor()
+            
+            # Add user_id column if it doesn't exist
+            cursor.execute("PRAGMA table_info(assets)")
+            columns = [column[1] for column in cursor.fetchall()]
+            if 'user_id' not in columns:
+                cursor.execute('ALTER TABLE assets ADD COLUMN user_id TEXT')
+            
+            params = _ASSET_GET({**_ASSET_DEFAULTS, **asset, **cls._row_overrides(user_id, 'asset_type', asset_type)})
+            return cls._execute_insert(cursor, _SQL_INSERT_ASSET, params, 'assets', return_row)
+    
+    @classmethod
+    def add_assets_bulk(cls, assets: List[Dict[str, Any]], user_id: str, conn: Optional[sqlite3.Connection] = None,
+                        asset_type: Optional[str] = None) -> int:
+        """Add many assets with one executemany and a single commit, with user isolation"""
+        overrides = cls._row_overrides(user_id, 'asset_type', asset_type)
+        rows = [_ASSET_GET({**_ASSET_DEFAULTS, **asset, **overrides}) for asset in assets]
+        return cls._insert_many('assets', _SQL_INSERT_ASSET, rows, conn)
+    
+    @classmethod
+    def add_assets_by_type(cls, assets_by_type: Dict[str, List[Dict[str, Any]]], user_id: str,
+                           conn: Optional[sqlite3.Connection] = None) -> int:
+        """Add assets grouped by asset_type (e.g. net worth investments) with one executemany"""
+        rows = []
+        for asset_type, assets in assets_by_type.items():
+            overrides = cls._row_overrides(user_id, 'asset_type', asset_type)
+            rows.extend(_ASSET_GET({**_ASSET_DEFAULTS, **asset, **overrides}) for asset in assets)
+        return cls._insert_many('assets', _SQL_INSERT_ASSET, rows, conn)
+    
+    @staticmethod
+    def _row_overrides(user_id: str, type_key: str, type_value: Optional[str]) -> Dict[str, Any]:
+        """Values that take precedence over an asset/liability dict's own when building its row"""
+        if type_value is None:
+            return {'user_id': str(user_id)}
+        return {'user_id': str(user_id), type_key: type_value}
+    
+    @classmethod
+    def _insert_many(cls, table: str, sql: str, rows: List[Tuple], conn: Optional[sqlite3.Connection] = None) -> int:
+        """Run one executemany INSERT for prepared rows and return how many were written"""
+        if not rows:
+            return 0
         
-        return asset_id
+        with cls._use_connection(conn) as conn:
+            cursor = conn.cursor()
+            
+            # Add user_id column if it doesn't exist
+            cursor.execute(f"PRAGMA table_info({table})")
+            columns = [column[1] for column in cursor.fetchall()]
+            if 'user_id' not in columns:
+                cursor.execute(f'ALTER TABLE {table} ADD COLUMN user_id TEXT')
+            
+            cursor.executemany(sql, rows)
+        return len(rows)
     
     @classmethod
     def get_assets(cls, user_id: str, asset_type: Optional[str] = None) -> List[Dict[str, Any]]:
         """Get assets from the database for a specific user, optionally filtered by type"""
-        conn = cls.get_connection()
-        cursor = conn.cursor()
-        
-        # Add user_id column if it doesn't exist
-        cursor.execute("PRAGMA table_info(assets)")
-        columns = [column[1] for column in cursor.fetchall()]
-        if 'user_id' not in columns:
-            cursor.execute('ALTER TABLE assets ADD COLUMN user_id TEXT')
-            cursor.execute('UPDATE assets SET user_id = ? WHERE user_id IS NULL', ('default_user',))
-            conn.commit()
-        
-        if asset_type:
-            cursor.execute('SELECT * FROM assets WHERE user_id = ? AND asset_type = ?', (str(user_id), asset_type))
-        else:
-            cursor.execute('SELECT * FROM assets WHERE user_id = ?', (str(user_id),))
+        uid = str(user_id)
+        with cls._borrow() as conn:
+            cursor = conn.cursor()
             
-        assets = [dict(row) for row in cursor.fetchall()]
-        
-        conn.close()
-        return assets
+            # Add user_id column if it doesn't exist
+            cursor.execute("PRAGMA table_info(assets)")
+            columns = [column[1] for column in cursor.fetchall()]
+            if 'user_id' not in columns:
+                cursor.execute('ALTER TABLE assets ADD COLUMN user_id TEXT')
+                cursor.execute('UPDATE assets SET user_id = ? WHERE user_id IS NULL', ('default_user',))
+                conn.commit()
+            
+            if asset_type:
+                cursor.execute(_SQL_SELECT_ASSETS_BY_TYPE, (uid, asset_type))
+            else:
+                cursor.execute(_SQL_SELECT_ASSETS, (uid,))
+                
+            assets = cls._fetch_dicts(cursor)
+            
+            return assets
     
     @classmethod
-    def update_asset(cls, asset_id: int, value: float, updated_at: str) -> bool:
+    def update_asset(cls, asset_id: int, value: float, updated_at: str, conn: Optional[sqlite3.Connection] = None) -> bool:
         """Update an asset's value in the database"""
-        conn = cls.get_connection()
-        cursor = conn.cursor()
-        
         try:
-            cursor.execute('''
-            UPDATE assets 
-            SET value = ?, updated_at = ? 
-            WHERE id = ?
-            ''', (value, updated_at, asset_id))
-            
-            updated = cursor.rowcount > 0
-            conn.commit()
-            return updated
+            with cls._use_connection(conn) as conn:
+                cursor = conn.cursor()
+                cursor.execute(_SQL_UPDATE_ASSET, (value, updated_at, asset_id))
+
+                return cursor.rowcount > 0
         except sqlite3.IntegrityError as e:
-            conn.rollback()
             logger.warning(f"Asset update integrity violation: {str(e)}")
             return False
         except sqlite3.OperationalError as e:
-            conn.rollback()
             logger.error(f"Asset update operation failed: {str(e)}")
             return False
         except Exception as e:
-            conn.rollback()
             logger.error(f"Unexpected error updating asset: {str(e)}")
             return False
-        finally:
-            conn.close()
     
     # Liability methods
     @classmethod
-    def add_liability(cls, liability: Dict[str, Any], user_id: str) -> int:
-        """Add a liability to the database with user isolation"""
-        conn = cls.get_connection()
-        cursor = conn.cursor()
-        
-        # Add user_id column if it doesn't exist
-        cursor.execute("PRAGMA table_info(liabilities)")
-        columns = [column[1] for column in cursor.fetchall()]
-        if 'user_id' not in columns:
-            cursor.execute('ALTER TABLE liabilities ADD COLUMN user_id TEXT')
-        
-        cursor.execute('''
-        INSERT INTO liabilities (name, value, owner, liability_type, user_id)
-        VALUES (?, ?, ?, ?, ?)
-        ''', (
-            liability.get('name'),
-            liability.get('value'),
-            liability.get('owner', 'Joint'),
-            liability.get('liability_type', 'Other'),
-            str(user_id)
-        ))
-        
-        liability_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
+    def add_liability(cls, liability: Dict[str, Any], user_id: str, conn: Optional[sqlite3.Connection] = None, return_row: bool = False,
+                      liability_type: Optional[str] = None) -> Union[int, Dict[str, Any]]:
+        """Add a liability to the database with user isolation
         
-        return liability_id
+        ``liability_type``, when given, overrides the dict's own value without the caller
+        having to write it into ``liability``.
+        """
+        with cls._use_connection(conn) as conn:
+            cursor = conn.cursor()
+            
+            # Add user_id column if it doesn't exist
+            cursor.execute("PRAGMA table_info(liabilities)")
+            columns = [column[1] for column in cursor.fetchall()]
+            if 'user_id' not in columns:
+                cursor.execute('ALTER TABLE liabilities ADD COLUMN user_id TEXT')
+            
+            params = _LIABILITY_GET({**_LIABILITY_DEFAULTS, **liability, **cls._row_overrides(user_id, 'liability_type', liability_type)})
+            return cls._execute_insert(cursor, _SQL_INSERT_LIABILITY, params, 'liabilities', return_row)
+    
+    @classmethod
+    def add_liabilities_bulk(cls, liabilities: List[Dict[str, Any]], user_id: str, conn: Optional[sqlite3.Connection] = None,
+                             liability_type: Optional[str] = None) -> int:
+        """Add many liabilities with one executemany and a single commit, with user isolation"""
+        overrides = cls._row_overrides(user_id, 'liability_type', liability_type)
+        rows = [_LIABILITY_GET({**_LIABILITY_DEFAULTS, **liability, **overrides}) for liability in liabilities]
+        return cls._insert_many('liabilities', _SQL_INSERT_LIABILITY, rows, conn)
+    
+    @classmethod
+    def add_liabilities_by_type(cls, liabilities_by_type: Dict[str, List[Dict[str, Any]]], user_id: str,
+                                conn: Optional[sqlite3.Connection] = None) -> int:
+        """Add liabilities grouped by liability_type (e.g. net worth debts) with one executemany"""
+        rows = []
+        for liability_type, liabilities in liabilities_by_type.items():
+            overrides = cls._row_overrides(user_id, 'liability_type', liability_type)
+            rows.extend(_LIABILITY_GET({**_LIABILITY_DEFAULTS, **liability, **overrides}) for liability in liabilities)
+        return cls._insert_many('liabilities', _SQL_INSERT_LIABILITY, rows, conn)
     
     @classmethod
     def get_liabilities(cls, user_id: str, liability_type: Optional[str] = None) -> List[Dict[str, Any]]:
         """Get liabilities from the database for a specific user, optionally filtered by type"""
-        conn = cls.get_connection()
-        cursor = conn.cursor()
-        
-        # Add user_id column if it doesn't exist
-        cursor.execute("PRAGMA table_info(liabilities)")
-        columns = [column[1] for column in cursor.fetchall()]
-        if 'user_id' not in columns:
-            cursor.execute('ALTER TABLE liabilities ADD COLUMN user_id TEXT')
-            cursor.execute('UPDATE liabilities SET user_id = ? WHERE user_id IS NULL', ('default_user',))
-            conn.commit()
-        
-        if liability_type:
-            cursor.execute('SELECT * FROM liabilities WHERE user_id = ? AND liability_type = ?', (str(user_id), liability_type))
-        else:
-            cursor.execute('SELECT * FROM liabilities WHERE user_id = ?', (str(user_id),))
+        uid = str(user_id)
+        with cls._borrow() as conn:
+            cursor = conn.cursor()
             
-        liabilities = [dict(row) for row in cursor.fetchall()]
-        
-        conn.close()
-        return liabilities
+            # Add user_id column if it doesn't exist
+            cursor.execute("PRAGMA table_info(liabilities)")
+            columns = [column[1] for column in cursor.fetchall()]
+            if 'user_id' not in columns:
+                cursor.execute('ALTER TABLE liabilities ADD COLUMN user_id TEXT')
+                cursor.execute('UPDATE liabilities SET user_id = ? WHERE user_id IS NULL', ('default_user',))
+                conn.commit()
+            
+            if liability_type:
+                cursor.execute(_SQL_SELECT_LIABILITIES_BY_TYPE, (uid, liability_type))
+            else:
+                cursor.execute(_SQL_SELECT_LIABILITIES, (uid,))
+                
+            liabilities = cls._fetch_dicts(cursor)
+            
+            return liabilities
     
     # Real estate methods
     @classmethod
-    def add_real_estate(cls, property: Dict[str, Any], user_id: str) -> int:
+    def add_real_estate(cls, property: Dict[str, Any], user_id: str, conn: Optional[sqlite3.Connection] = None, return_row: bool = False) -> Union[int, Dict[str, Any]]:
         """Add a real estate property to the database with user isolation"""
-        conn = cls.get_connection()
-        cursor = conn.cursor()
-        
-        # Add user_id column if it doesn't exist
-        cursor.execute("PRAGMA table_info(real_estate)")
-        columns = [column[1] for column in cursor.fetchall()]
-        if 'user_id' not in columns:
-            cursor.execute('ALTER TABLE real_estate ADD COLUMN user_id TEXT')
-        
-        cursor.execute('''
-        INSERT INTO real_estate (name, current_value, purchase_value, owner, user_id)
-        VALUES (?, ?, ?, ?, ?)
-        ''', (
-            property.get('name'),
-            property.get('current_value'),
-            property.get('purchase_value', 0),
-            property.get('owner', 'Joint'),
-            str(user_id)
-        ))
-        
-        property_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
-        
-        return property_id
+        with cls._use_connection(conn) as conn:
+            cursor = conn.cursor()
+            
+            # Add user_id column if it doesn't exist
+            cursor.execute("PRAGMA table_info(real_estate)")
+            columns = [column[1] for column in cursor.fetchall()]
+            if 'user_id' not in columns:
+                cursor.execute('ALTER TABLE real_estate ADD COLUMN user_id TEXT')
+            
+            params = _REAL_ESTATE_GET({**_REAL_ESTATE_DEFAULTS, **property, 'user_id': str(user_id)})
+            return cls._execute_insert(cursor, _SQL_INSERT_REAL_ESTATE, params, 'real_estate', return_row)
+    
+    @classmethod
+    def add_real_estate_bulk(cls, properties: List[Dict[str, Any]], user_id: str, conn: Optional[sqlite3.Connection] = None) -> int:
+        """Add many real estate properties with one executemany and a single commit, with user isolation"""
+        uid = str(user_id)
+        rows = [_REAL_ESTATE_GET({**_REAL_ESTATE_DEFAULTS, **property, 'user_id': uid}) for property in properties]
+        return cls._insert_many('real_estate', _SQL_INSERT_REAL_ESTATE, rows, conn)
     
     @classmethod
     def get_real_estate(cls, user_id: str) -> List[Dict[str, Any]]:
         """Get all real estate properties from the database for a specific user"""
-        conn = cls.get_connection()
-        cursor = conn.cursor()
-        
-        # Add user_id column if it doesn't exist
-        cursor.execute("PRAGMA table_info(real_estate)")
-        columns = [column[1] for column in cursor.fetchall()]
-        if 'user_id' not in columns:
-            cursor.execute('ALTER TABLE real_estate ADD COLUMN user_id TEXT')
-            cursor.execute('UPDATE real_estate SET user_id = ? WHERE user_id IS NULL', ('default_user',))
-            conn.commit()
-        
-        cursor.execute('SELECT * FROM real_estate WHERE user_id = ?', (str(user_id),))
-        properties = [dict(row) for row in cursor.fetchall()]
+        with cls._borrow() as conn:
+            cursor = conn.cursor()
+            
+            # Add user_id column if it doesn't exist
+            cursor.execute("PRAGMA table_info(real_estate)")
+            columns = [column[1] for column in cursor.fetchall()]
+            if 'user_id' not in columns:
+                cursor.execute('ALTER TABLE real_estate ADD COLUMN user_id TEXT')
+                cursor.execute('UPDATE real_estate SET user_id = ? WHERE user_id IS NULL', ('default_user',))
+                conn.commit()
+            
+            cursor.execute(_SQL_SELECT_REAL_ESTATE, (str(user_id),))
+            properties = cls._fetch_dicts(cursor)
+            
+            return properties
+    
+    @classmethod
+    def get_networth_bundle(cls, user_id: str) -> Dict[str, List[Dict[str, Any]]]:
+        """Get a user's assets, liabilities and real estate with one pooled connection
         
-        conn.close()
-        return properties
+        Returns:
+            {'assets': [...], 'liabilities': [...], 'real_estate': [...]}
+        """
+        uid = str(user_id)
+        try:
+            with cls._borrow() as conn:
+                cursor = conn.cursor()
+                bundle = {}
+                for key, sql in (('assets', _SQL_SELECT_ASSETS), ('liabilities', _SQL_SELECT_LIABILITIES), ('real_estate', _SQL_SELECT_REAL_ESTATE)):
+                    cursor.execute(sql, (uid,))
+                    bundle[key] = cls._fetch_dicts(cursor)
+                return bundle
+        except sqlite3.OperationalError:
+            # Tables from before per-user isolation lack user_id; the single getters add it
+            return {
+                'assets': cls.get_assets(user_id),
+                'liabilities': cls.get_liabilities(user_id),
+                'real_estate': cls.get_real_estate(user_id),
+            }
     
     # Budget methods
     @classmethod
     def add_budget(cls, budget_item: Dict[str, Any], user_id: str) -> int:
         """Add or update a budget item in the database with user isolation"""
         # Validate required fields
-        if not budget_item.get('category'):
-            logger.warning("Budget category is required")
+        if not cls._is_valid_budget_item(budget_item):
             return 0
-        if budget_item.get('amount') is None or budget_item.get('amount') < 0:
-            logger.warning(f"Invalid budget amount: {budget_item.get('amount')}")
-            return 0
-        if not budget_item.get('month') or not budget_item.get('year'):
-            logger.warning("Budget month and year are required")
-            return 0
-        
-        conn = cls.get_connection()
-        cursor = conn.cursor()
         
+        uid = str(user_id)
         try:
-            # Check if budget item already exists
-            cursor.execute('''
-            SELECT id FROM budget 
-            WHERE category = ? AND month = ? AND year = ? AND user_id = ?
-            ''', (
-                budget_item.get('category'),
-                budget_item.get('month'),
-                budget_item.get('year'),
-                str(user_id)
-            ))
-            existing = cursor.fetchone()
-            
-            if existing:
-                # Update existing budget item
-                cursor.execute('''
-                UPDATE budget 
-                SET amount = ?, updated_at = CURRENT_TIMESTAMP 
-                WHERE id = ?
-                ''', (budget_item.get('amount'), existing[0]))
-                budget_id = existing[0]
-            else:
-                # Insert new budget item
-                cursor.execute('''
-                INSERT INTO budget (category, amount, month, year, user_id)
-                VALUES (?, ?, ?, ?, ?)
-                ''', (
+            with cls._use_connection() as conn:
+                cursor = conn.cursor()
+                
+                # Check if budget item already exists
+                cursor.execute(_SQL_SELECT_BUDGET_ID, (
                     budget_item.get('category'),
-                    budget_item.get('amount'),
                     budget_item.get('month'),
                     budget_item.get('year'),
-                    str(user_id)
+                    uid
                 ))
-                budget_id = cursor.lastrowid
+                existing = cursor.fetchone()
+                
+                if existing:
+                    # Update existing budget item
+                    cursor.execute(_SQL_UPDATE_BUDGET_AMOUNT, (budget_item.get('amount'), existing[0]))
+                    budget_id = existing[0]
+                else:
+                    # Insert new budget item
+                    cursor.execute(_SQL_INSERT_BUDGET, (
+                        budget_item.get('category'),
+                        budget_item.get('amount'),
+                        budget_item.get('month'),
+                        budget_item.get('year'),
+                        uid
+                    ))
+                    budget_id = cursor.lastrowid
             
-            conn.commit()
             return budget_id if budget_id else 0
             
         except sqlite3.IntegrityError as e:
             logger.warning(f"Budget constraint violation for {budget_item.get('category', 'unknown')}: {str(e)}")
-            conn.rollback()
             return 0
         except sqlite3.OperationalError as e:
             logger.error(f"Budget operation failed for {budget_item.get('category', 'unknown')}: {str(e)}")
-            conn.rollback()
             return 0
         except Exception as e:
             logger.error(f"Unexpected error adding budget for {budget_item.get('category', 'unknown')}: {str(e)}")
-            conn.rollback()
             return 0
-        finally:
-            conn.close()
+    
+    @staticmethod
+    def _is_valid_budget_item(budget_item: Dict[str, Any]) -> bool:
+        """Check a budget item's required fields, logging why it is rejected"""
+        if not budget_item.get('category'):
+            logger.warning("Budget category is required")
+            return False
+        if budget_item.get('amount') is None or budget_item.get('amount') < 0:
+            logger.warning(f"Invalid budget amount: {budget_item.get('amount')}")
+            return False
+        if not budget_item.get('month') or not budget_item.get('year'):
+            logger.warning("Budget month and year are required")
+            return False
+        return True
     
     @classmethod
-    def get_budget(cls, month: Optional[str] = None, year: Optional[int] = None, user_id: str = None) -> List[Dict[str, Any]]:
-        """Get budget items from the database for specific user, optionally filtered by month and year"""
-        conn = cls.get_connection()
-        cursor = conn.cursor()
-        
-        # Add user_id column if it doesn't exist
-        cursor.execute("PRAGMA table_info(budget)")
-        columns = [column[1] for column in cursor.fetchall()]
-        if 'user_id' not in columns:
-            cursor.execute('ALTER TABLE budget ADD COLUMN user_id TEXT')
-            cursor.execute('UPDATE budget SET user_id = ? WHERE user_id IS NULL', ('default_user',))
-            conn.commit()
+    def add_budgets_bulk(cls, budget_items: List[Dict[str, Any]], user_id: str, conn: Optional[sqlite3.Connection] = None) -> int:
+        """Add or update many budget items in one transaction with user isolation
         
-        if not user_id:
-            return []  # Don't return any budget data without user_id
+        Invalid items are skipped, as add_budget does. Existing ids are looked up once
+        per month/year and the rows are then written with one executemany UPDATE and
+        one executemany INSERT.
         
-        if month and year:
-            cursor.execute('SELECT * FROM budget WHERE month = ? AND year = ? AND user_id = ?', (month, year, str(user_id)))
-        elif year:
-            cursor.execute('SELECT * FROM budget WHERE year = ? AND user_id = ?', (year, str(user_id)))
-        else:
-            # Default to current month and year
-            current_month = datetime.now().strftime('%Y-%m')
-            year, month = current_month.split('-')
-            cursor.execute('SELECT * FROM budget WHERE month = ? AND year = ? AND user_id = ?', (month, int(year), str(user_id)))
-            
-        budget_items = [dict(row) for row in cursor.fetchall()]
+        Returns:
+            Number of budget items written
+        """
+        uid = str(user_id)
+        # Later items for the same category and period win, as repeated add_budget calls would
+        items = {
+            (item['category'], item['month'], item['year']): item['amount']
+            for item in budget_items if cls._is_valid_budget_item(item)
+        }
+        if not items:
+            return 0
         
-        conn.close()
-        return budget_items
+        with cls._use_connection(conn) as conn:
+            existing = {}
+            for month, year in {(month, year) for _, month, year in items}:
+                for row in conn.execute(_SQL_SELECT_BUDGET_BY_MONTH, (month, year, uid)):
+                    existing[(row['category'], month, year)] = row['id']
+            
+            updates = [(amount, existing[key]) for key, amount in items.items() if key in existing]
+            inserts = [(category, amount, month, year, uid) for (category, month, year), amount in items.items() if (category, month, year) not in existing]
+            conn.executemany(_SQL_UPDATE_BUDGET_AMOUNT, updates)
+            conn.executemany(_SQL_INSERT_BUDGET, inserts)
+        return len(items)
+    
+    @classmethod
+    def get_budget(cls, month: Optional[str] = None, year: Optional[int] = None, user_id: str = None) -> List[Dict[str, Any]]:
+        """Get budget items from the database for specific user, optionally filtered by month and year"""
+        with cls._borrow() as conn:
+            cursor = conn.cursor()
+            
+            # Add user_id column if it doesn't exist
+            cursor.execute("PRAGMA table_info(budget)")
+            columns = [column[1] for column in cursor.fetchall()]
+            if 'user_id' not in columns:
+                cursor.execute('ALTER TABLE budget ADD COLUMN user_id TEXT')
+                cursor.execute('UPDATE budget SET user_id = ? WHERE user_id IS NULL', ('default_user',))
+                conn.commit()
+            
+            if not user_id:
+                return []  # Don't return any budget data without user_id
+            
+            uid = str(user_id)
+            if month and year:
+                cursor.execute(_SQL_SELECT_BUDGET_BY_MONTH, (month, year, uid))
+            elif year:
+                cursor.execute(_SQL_SELECT_BUDGET_BY_YEAR, (year, uid))
+            else:
+                # Default to current month and year
+                current_month = datetime.now().strftime('%Y-%m')
+                year, month = current_month.split('-')
+                cursor.execute(_SQL_SELECT_BUDGET_BY_MONTH, (month, int(year), uid))
+                
+            budget_items = cls._fetch_dicts(cursor)
+            
+            return budget_items
     
     # Statement tracking methods
     @classmethod
-    def add_statement(cls, statement: Dict[str, Any]) -> int:
-        """Add a processed statement record to the database"""
-        conn = cls.get_connection()
-        cursor = conn.cursor()
+    def add_statement(cls, statement: Dict[str, Any], conn: Optional[sqlite3.Connection] = None) -> int:
+        """Add a processed statement record to the database
+        
+        Re-processing an existing statement refreshes its processed_date and returns the
+        existing id, so callers can tell the stored row apart from a failure (0).
+        """
+        params = (
+            statement.get('bank_name'),
+            statement.get('account_number'),
+            statement.get('account_type'),
+            statement.get('statement_month'),
+            statement.get('statement_year'),
+            statement.get('processed_date')
+        )
         
         try:
-            cursor.execute('''
-            INSERT OR IGNORE INTO statements 
-            (bank_name, account_number, account_type, statement_month, statement_year, processed_date)
-            VALUES (?, ?, ?, ?, ?, ?)
-            ''', (
-                statement.get('bank_name'),
-                statement.get('account_number'),
-                statement.get('account_type'),
-                statement.get('statement_month'),
-                statement.get('statement_year'),
-                statement.get('processed_date')
-            ))
-            
-            statement_id = cursor.lastrowid
-            conn.commit()
-            return statement_id
+            with cls._use_connection(conn) as conn:
+                cursor = conn.cursor()
+                if _HAS_RETURNING:
+                    cursor.execute(_SQL_UPSERT_STATEMENT, params)
+                else:
+                    cursor.execute(_SQL_INSERT_STATEMENT, params)
+                    cursor.execute(_SQL_SELECT_STATEMENT_ID, params[:5])
+                row = cursor.fetchone()
+                return row[0] if row else 0
         except sqlite3.IntegrityError as e:
-            conn.rollback()
-            logger.info(f"Statement already processed: {str(e)}")
+            logger.warning(f"Statement constraint violation: {str(e)}")
             return 0
         except sqlite3.OperationalError as e:
-            conn.rollback()
             logger.error(f"Statement operation failed: {str(e)}")
             return 0
         except Exception as e:
-            conn.rollback()
             logger.error(f"Unexpected error adding statement: {str(e)}")
             return 0
-        finally:
-            conn.close()
     
     @classmethod
     def get_statements(cls) -> List[Dict[str, Any]]:
         """Get all processed statement records"""
-        conn = cls.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('SELECT * FROM statements')
-        statements = [dict(row) for row in cursor.fetchall()]
-        
-        conn.close()
-        return statements
+        with cls._borrow() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute(_SQL_SELECT_STATEMENTS)
+            statements = cls._fetch_dicts(cursor)
+            
+            return statements
     
     # User preferences methods
     @classmethod
-    def save_user_preference(cls, key: str, value: Any, user_id: str) -> bool:
+    def save_user_preference(cls, key: str, value: Any, user_id: str, conn: Optional[sqlite3.Connection] = None) -> bool:
         """Save user preference to database with user isolation"""
-        conn = None
         try:
-            conn = cls.get_connection()
-            cursor = conn.cursor()
-            
-            # Create preferences table if it doesn't exist
-            cursor.execute('''
-            CREATE TABLE IF NOT EXISTS user_preferences (
-                key TEXT NOT NULL,
-                user_id TEXT NOT NULL,
-                value TEXT NOT NULL,
-                updated_at TEXT DEFAULT CURRENT_TIMESTAMP,
-                PRIMARY KEY (key, user_id)
-            )
-            ''')
-            
-            # Save preference as JSON
-            import json
-            value_json = json.dumps(value)
-            
-            cursor.execute('''
-            INSERT OR REPLACE INTO user_preferences (key, user_id, value, updated_at)
-            VALUES (?, ?, ?, CURRENT_TIMESTAMP)
-            ''', (key, str(user_id), value_json))
+            with cls._use_connection(conn) as conn:
+                # Save preference as JSON
+                value_json = _dumps(value)
+                
+                conn.execute(_SQL_UPSERT_PREFERENCE, (key, str(user_id), value_json))
             
-            conn.commit()
             return True
         except sqlite3.OperationalError as e:
-            if conn:
-                conn.rollback()
             logger.error(f"User preference operation failed: {str(e)}")
             return False
-        except json.JSONEncodeError as e:
-            if conn:
-                conn.rollback()
+        except TypeError as e:
             logger.error(f"Failed to serialize preference data: {str(e)}")
             return False
         except Exception as e:
-            if conn:
-                conn.rollback()
             logger.error(f"Unexpected error saving user preference: {str(e)}")
             return False
-        finally:
-            if conn:
-                conn.close()
     
     @classmethod
     def get_user_preference(cls, key: str, user_id: str, default_value: Any = None) -> Any:
         """Get user preference from database for specific user"""
         conn = None
         try:
-            conn = cls.get_connection()
+            conn = cls._acquire()
             cursor = conn.cursor()
             
-            # Create table if it doesn't exist
-            cursor.execute('''
-            CREATE TABLE IF NOT EXISTS user_preferences (
-                key TEXT NOT NULL,
-                user_id TEXT NOT NULL,
-                value TEXT NOT NULL,
-                updated_at TEXT DEFAULT CURRENT_TIMESTAMP,
-                PRIMARY KEY (key, user_id)
-            )
-            ''')
-            
-            cursor.execute('SELECT value FROM user_preferences WHERE key = ? AND user_id = ?', (key, str(user_id)))
+            cursor.execute(_SQL_SELECT_PREFERENCE, (key, str(user_id)))
             result = cursor.fetchone()
             
             if result:
-                import json
-                return json.loads(result[0])
+                return _loads(result[0])
             else:
                 return default_value
         except sqlite3.OperationalError as e:
@@ -830,138 +1299,170 @@ class DatabaseService:
             return default_value
         finally:
             if conn:
-                conn.close()
+                cls._release(conn)
     @classmethod
-    def _log_audit_action(cls, user_id: str, action: str, table_name: str, record_id: int, old_data: Dict = None, new_data: Dict = None):
+    def _log_audit_action(cls, user_id: str, action: str, table_name: str, record_id: int, old_data: Dict = None, new_data: Dict = None, conn: Optional[sqlite3.Connection] = None):
         """Log audit action for sensitive operations"""
-        conn = cls.get_connection()
-        cursor = conn.cursor()
+        cls._log_audit_actions_bulk([(user_id, action, table_name, record_id, old_data, new_data)], conn=conn)
+    
+    @classmethod
+    def _log_audit_actions_bulk(cls, entries: List[Tuple[str, str, str, int, Optional[Dict], Optional[Dict]]], conn: Optional[sqlite3.Connection] = None):
+        """Log several audit actions with one executemany
+        
+        Args:
+            entries: (user_id, action, table_name, record_id, old_data, new_data) tuples
+            conn: Optional open connection; when given the rows join the caller's
+                transaction and the caller owns the commit
+        """
+        if not entries:
+            return
         
         try:
-            cursor.execute('''
-            INSERT INTO audit_log (user_id, action, table_name, record_id, old_data, new_data)
-            VALUES (?, ?, ?, ?, ?, ?)
-            ''', (
-                user_id,
-                action,
-                table_name,
-                record_id,
-                json.dumps(old_data) if old_data else None,
-                json.dumps(new_data) if new_data else None
-            ))
-            conn.commit()
+            rows = [
+                (
+                    user_id,
+                    action,
+                    table_name,
+                    record_id,
+                    _dumps(old_data) if old_data else None,
+                    _dumps(new_data) if new_data else None
+                )
+                for user_id, action, table_name, record_id, old_data, new_data in entries
+            ]
+            with cls._use_connection(conn) as conn:
+                conn.executemany(_SQL_INSERT_AUDIT, rows)
         except sqlite3.OperationalError as e:
             logger.error(f"Audit logging failed: {str(e)}")
-        except json.JSONEncodeError as e:
+        except TypeError as e:
             logger.error(f"Failed to serialize audit data: {str(e)}")
         except Exception as e:
             logger.error(f"Unexpected error in audit logging: {str(e)}")
-        finally:
-            conn.close()
     
     @classmethod
     def get_audit_log(cls, user_id: str, limit: int = 100) -> List[Dict[str, Any]]:
         """Get audit log entries for a user"""
-        conn = cls.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-        SELECT * FROM audit_log 
-        WHERE user_id = ? 
-        ORDER BY timestamp DESC 
-        LIMIT ?
-        ''', (user_id, limit))
-        
-        audit_entries = [dict(row) for row in cursor.fetchall()]
-        conn.close()
-        
-        return audit_entries
+        with cls._borrow() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute(_SQL_SELECT_AUDIT_LOG, (user_id, limit))
+            
+            audit_entries = cls._fetch_dicts(cursor)
+            
+            return audit_entries
     
     @classmethod
-    def create_undo_snapshot(cls, user_id: str, action: str, data: Dict) -> int:
+    def create_undo_snapshot(cls, user_id: str, action: str, data: Dict, conn: Optional[sqlite3.Connection] = None) -> int:
         """Create undo snapshot for destructive actions"""
-        conn = cls.get_connection()
-        cursor = conn.cursor()
-        
-        # Table already created in initialize_database
+        # Serialize before taking the write lock so only the INSERT runs inside the transaction
+        payload = _pack_snapshot(data)
+        expires_at = (datetime.now() + cls.UNDO_SNAPSHOT_TTL).isoformat()
         
-        # Set expiration to 24 hours from now
-        from datetime import datetime, timedelta
-        expires_at = (datetime.now() + timedelta(hours=24)).isoformat()
+        with cls._use_connection(conn) as conn:
+            return conn.execute(_SQL_INSERT_UNDO, (user_id, action, payload, expires_at)).lastrowid
+    
+    @classmethod
+    def create_undo_snapshots_bulk(cls, snapshots: List[Tuple[str, str, Dict]], conn: Optional[sqlite3.Connection] = None) -> int:
+        """Create several undo snapshots with one executemany and a single commit
         
-        cursor.execute('''
-        INSERT INTO undo_snapshots (user_id, action, data, expires_at)
-        VALUES (?, ?, ?, ?)
-        ''', (user_id, action, json.dumps(data), expires_at))
+        Args:
+            snapshots: (user_id, action, data) tuples
+            conn: Optional open connection; when given the caller owns the commit
+        """
+        if not snapshots:
+            return 0
         
-        snapshot_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
+        expires_at = (datetime.now() + cls.UNDO_SNAPSHOT_TTL).isoformat()
+        rows = [(user_id, action, _pack_snapshot(data), expires_at) for user_id, action, data in snapshots]
         
-        return snapshot_id
+        with cls._use_connection(conn) as conn:
+            conn.executemany(_SQL_INSERT_UNDO, rows)
+        return len(rows)
     
     @classmethod
     def get_undo_snapshots(cls, user_id: str) -> List[Dict[str, Any]]:
         """Get available undo snapshots for user"""
-        conn = cls.get_connection()
-        cursor = conn.cursor()
-        
-        # Clean up expired snapshots first
-        cursor.execute('DELETE FROM undo_snapshots WHERE expires_at < datetime("now")')
-        
-        cursor.execute('''
-        SELECT * FROM undo_snapshots 
-        WHERE user_id = ? 
-        ORDER BY created_at DESC
-        ''', (user_id,))
-        
-        snapshots = [dict(row) for row in cursor.fetchall()]
-        conn.commit()
-        conn.close()
+        with cls._borrow() as conn:
+            cursor = conn.cursor()
+            
+            # Expired snapshots are skipped here and deleted by purge_expired_undo_snapshots
+            cursor.execute(_SQL_SELECT_UNDO_BY_USER, (user_id, datetime.now().isoformat()))
+            
+            snapshots = cls._fetch_dicts(cursor)
+            
+            return snapshots
+    
+    @classmethod
+    def purge_expired_undo_snapshots(cls) -> int:
+        """Delete all expired undo snapshots in one transaction and return how many were removed"""
+        try:
+            with cls._use_connection() as conn:
+                # expires_at is written with datetime.isoformat(), so compare in the same format
+                return conn.execute(_SQL_DELETE_EXPIRED_UNDO, (datetime.now().isoformat(),)).rowcount
+        except Exception as e:
+            logger.error(f"Expired undo snapshot cleanup failed: {str(e)}")
+            return 0
+    
+    @classmethod
+    def _schedule_undo_cleanup(cls):
+        """Arm a background timer that purges expired undo snapshots every UNDO_CLEANUP_INTERVAL seconds"""
+        if cls._undo_cleanup_timer is not None:
+            return
         
-        return snapshots
+        cls._undo_cleanup_timer = threading.Timer(cls.UNDO_CLEANUP_INTERVAL, cls._run_undo_cleanup)
+        cls._undo_cleanup_timer.daemon = True
+        cls._undo_cleanup_timer.start()
+    
+    @classmethod
+    def _run_undo_cleanup(cls):
+        """Timer callback: purge, then re-arm"""
+        cls._undo_cleanup_timer = None
+        cls.purge_expired_undo_snapshots()
+        cls._schedule_undo_cleanup()
     
     @classmethod
     def restore_from_undo(cls, snapshot_id: int, user_id: str) -> bool:
-        """Restore data from undo snapshot"""
-        conn = cls.get_connection()
-        cursor = conn.cursor()
+        """Restore data from undo snapshot
         
+        The snapshot is claimed with DELETE ... RETURNING and its transactions are
+        re-inserted in the same BEGIN IMMEDIATE transaction, so a failed restore
+        leaves the snapshot in place.
+        """
         try:
-            # Get snapshot data
-            cursor.execute('SELECT * FROM undo_snapshots WHERE id = ? AND user_id = ?', (snapshot_id, user_id))
-            snapshot = cursor.fetchone()
-            
-            if not snapshot:
-                return False
-            
-            data = json.loads(snapshot['data'])
-            action = snapshot['action']
-            
-            if action == 'DELETE_TRANSACTION':
-                # Restore deleted transaction
-                cls.add_transaction(data, user_id)
-            elif action == 'BULK_DELETE_TRANSACTIONS':
-                # Restore multiple deleted transactions
-                for transaction in data['transactions']:
-                    cls.add_transaction(transaction, user_id)
-            
-            # Remove the used snapshot
-            cursor.execute('DELETE FROM undo_snapshots WHERE id = ?', (snapshot_id,))
-            conn.commit()
+            with cls.transaction() as conn:
+                # Fetch and remove the snapshot in one statement
+                if _HAS_RETURNING:
+                    snapshot = conn.execute(_SQL_TAKE_UNDO, (snapshot_id, user_id)).fetchone()
+                else:
+                    snapshot = conn.execute(_SQL_SELECT_UNDO, (snapshot_id, user_id)).fetchone()
+                    if snapshot:
+                        conn.execute(_SQL_DELETE_UNDO, (snapshot_id,))
+                
+                if not snapshot:
+                    return False
+                
+                data = _unpack_snapshot(snapshot['data'])
+                action = snapshot['action']
+                
+                if action == 'DELETE_TRANSACTION':
+                    # Restore deleted transaction
+                    transactions = [data]
+                elif action == 'BULK_DELETE_TRANSACTIONS':
+                    # Restore multiple deleted transactions with one executemany
+                    transactions = data['transactions']
+                else:
+                    transactions = []
+                
+                for transaction in transactions:
+                    cls._validate_transaction(transaction)
+                conn.executemany(_SQL_INSERT_TX, [cls._transaction_row(transaction, user_id) for transaction in transactions])
             return True
             
         except sqlite3.OperationalError as e:
-            conn.rollback()
             logger.error(f"Undo operation failed: {str(e)}")
             return False
-        except json.JSONDecodeError as e:
-            conn.rollback()
+        except _SNAPSHOT_DECODE_ERRORS as e:
             logger.error(f"Corrupted undo data: {str(e)}")
             return False
         except Exception as e:
-            conn.rollback()
             logger.error(f"Unexpected error during undo: {str(e)}")
             return False
-        finally:
-            conn.close()
\ No newline at end of file
@@ -1,18 +1,38 @@
+import numpy as np
 import pandas as pd
 import re
 import os
 import io
+import shutil
 import tempfile
 import json
-from datetime import datetime
-from typing import Dict, Any, List, Optional, Tuple, BinaryIO
+import warnings
+import logging
+from datetime import date, datetime
+from typing import Dict, Any, Iterator, List, Optional, Tuple, BinaryIO
 from services.database_service import DatabaseService
 from services.bank_statement_parser import BankStatementParser
 
+logger = logging.getLogger(__name__)
+
 class DocumentParserService:
     """Service for parsing financial documents"""
     
     SUPPORTED_FORMATS = ['.pdf', '.csv', '.xls', '.xlsx']
+    BANK_DATE_FORMATS = ('%m/%d/%Y', '%Y-%m-%d', '%d/%m/%Y')  # Tried in order for text dates
+    _pdf_support = False  # Set once a PDF library has been found
+    PDF_PLATEAU_PAGES = 3  # Re-parse every this many pages; stop once a re-parse adds no transactions
+    TABULA_JAVA_OPTIONS = ['-Xmx512m', '-Dfile.encoding=UTF-8']
+    
+    # Filename keywords per document type, in priority order when several match
+    DOCUMENT_TYPE_KEYWORDS = {
+        'bank': ('bank', 'checking', 'saving', 'deposit'),
+        'credit': ('credit', 'card', 'visa', 'mastercard'),
+        'brokerage': ('broker', 'invest', 'stock', 'etf', 'mutual', 'fund'),
+    }
+    _KEYWORD_TO_TYPE = {keyword: doc_type for doc_type, keywords in DOCUMENT_TYPE_KEYWORDS.items() for keyword in keywords}
+    # Longest keywords first so 'mastercard' is matched whole rather than as 'card'
+    _DOCUMENT_TYPE_RE = re.compile('|'.join(sorted(_KEYWORD_TO_TYPE, key=len, reverse=True)), re.IGNORECASE)
     
     @classmethod
     def parse_document(cls, file_obj: BinaryIO, filename: str, document_type: str = None) -> Tuple[List[Dict[str, Any]], str]:
@@ -70,15 +90,13 @@ class DocumentParserService:
         Returns:
             Document type: 'bank', 'credit', or 'brokerage'
         """
-        # Simple detection based on filename
-        filename_lower = filename.lower()
+        # Simple detection based on filename: one regex pass collects every keyword present
+        found = {cls._KEYWORD_TO_TYPE[keyword.lower()] for keyword in cls._DOCUMENT_TYPE_RE.findall(filename)}
         
-        if any(keyword in filename_lower for keyword in ['bank', 'checking', 'saving', 'deposit']):
-            return 'bank'
-        elif any(keyword in filename_lower for keyword in ['credit', 'card', 'visa', 'mastercard']):
-            return 'credit'
-        elif any(keyword in filename_lower for keyword in ['broker', 'invest', 'stock', 'etf', 'mutual', 'fund']):
-            return 'brokerage'
+        # Earlier types win, matching the old bank -> credit -> brokerage checks
+        for doc_type in cls.DOCUMENT_TYPE_KEYWORDS:
+            if doc_type in found:
+                return doc_type
         
         # Default to bank statement
         return 'bank'
@@ -100,95 +118,36 @@ class DocumentParserService:
             }]
         
         try:
-            # Save to temporary file for processing
+            # Save to temporary file for processing, streaming in 1 MiB chunks
             with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as temp_file:
                 file_obj.seek(0)
-                temp_file.write(file_obj.read())
+                shutil.copyfileobj(file_obj, temp_file, 1 << 20)
                 temp_path = temp_file.name
             
             try:
                 transactions = []
                 
-                # Try pdfplumber first (best for text-based PDFs)
-                try:
-                    import pdfplumber
-                    
-                    with pdfplumber.open(temp_path) as pdf:
-                        text = ""
-                        for page in pdf.pages:
-                            text += page.extract_text() or ""
-                        
-                        if text.strip() and document_type == 'bank':
-                            # Use the dynamic bank statement parser
-                            parsed_transactions, metadata = BankStatementParser.parse_text(text)
-                            
-                            # Add metadata to transactions
-                            if metadata and parsed_transactions:
-                                # DO NOT process statement metadata here - it will be done in document_upload_page.py
-                                # after the account type is set
-                                
-                                for transaction in parsed_transactions:
-                                    # Store metadata in additional_data for database storage
-                                    if 'additional_data' not in transaction:
-                                        transaction['additional_data'] = {}
-                                    transaction['additional_data']['statement_metadata'] = metadata
-                                    
-                                    # Also keep it directly accessible for immediate use
-                                    transaction['statement_metadata'] = metadata
-                            
-                            transactions.extend(parsed_transactions)
-                except ImportError:
-                    print("pdfplumber not available")
-                except Exception as e:
-                    print(f"Error extracting text with pdfplumber: {e}")
-                
-                # If no transactions found, try PyPDF2
-                if not transactions:
+                if document_type == 'bank':
                     try:
-                        import PyPDF2
-                        
-                        with open(temp_path, 'rb') as f:
-                            pdf_reader = PyPDF2.PdfReader(f)
-                            text = ""
-                            
-                            for page_num in range(len(pdf_reader.pages)):
-                                text += pdf_reader.pages[page_num].extract_text()
-                            
-                            if text.strip() and document_type == 'bank':
-                                # Use the dynamic bank statement parser
-                                parsed_transactions, metadata = BankStatementParser.parse_text(text)
-                                
-                                # Add metadata to transactions
-                                if metadata and parsed_transactions:
-                                    # DO NOT process statement metadata here - it will be done in document_upload_page.py
-                                    # after the account type is set
-                                    
-                                    for transaction in parsed_transactions:
-                                        # Store metadata in additional_data for database storage
-                                        if 'additional_data' not in transaction:
-                                            transaction['additional_data'] = {}
-                                        transaction['additional_data']['statement_metadata'] = metadata
-                                        
-                                        # Also keep it directly accessible for immediate use
-                                        transaction['statement_metadata'] = metadata
-                                
-                                transactions.extend(parsed_transactions)
-                    except ImportError:
-                        print("PyPDF2 not available")
+                        # Use the dynamic bank statement parser
+                        parsed_transactions, metadata = cls._parse_pdf_text(temp_path)
+                        transactions.extend(cls._attach_statement_metadata(parsed_transactions, metadata))
                     except Exception as e:
-                        print(f"Error extracting text with PyPDF2: {e}")
+                        logger.warning(f"Error parsing extracted PDF text: {e}")
                 
-                # If still no transactions, try tabula for tables
+                # If the text gave no transactions, try tabula for tables
                 if not transactions:
                     try:
                         import tabula
                         
-                        tables = tabula.read_pdf(temp_path, pages='all', multiple_tables=True)
-                        if tables:
-                            for df in tables:
-                                if not df.empty:
-                                    if document_type == 'bank':
-                                        transactions.extend(cls._parse_bank_statement_df(df))
+                        # Stream mode suits the ruling-free tables of text statements
+                        tables = tabula.read_pdf(
+                            temp_path, pages='all', multiple_tables=True, stream=True,
+                            java_options=cls.TABULA_JAVA_OPTIONS
+                        )
+                        if tables and document_type == 'bank':
+                            for df in cls._merge_tables(tables):
+                                transactions.extend(cls._parse_bank_statement_df(df))
                     except ImportError:
                         print("tabula-py not available")
                     except Exception as e:
@@ -206,6 +165,118 @@ class DocumentParserService:
         except Exception as e:
             raise ValueError(f"Error parsing PDF: {str(e)}")
     
+    @classmethod
+    def _parse_pdf_text(cls, pdf_path: str) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """
+        Parse the PDF's text with pdfplumber, retrying with PyPDF2 when that finds no transactions
+        
+        Returns:
+            Tuple of (transactions, metadata) from the first extractor that yields any transactions
+        """
+        transactions, metadata = [], {}
+        for pages in (cls._iter_pdfplumber_pages(pdf_path), cls._iter_pypdf2_pages(pdf_path)):
+            transactions, metadata = cls._parse_page_stream(pages)
+            if transactions:
+                break
+        return transactions, metadata
+    
+    @classmethod
+    def _parse_page_stream(cls, pages: Iterator[str]) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """
+        Parse page text as it streams in, stopping once the transaction count plateaus
+        
+        The text read so far is re-parsed every PDF_PLATEAU_PAGES non-blank pages.
+        Statements keep their transaction table in the first pages, so once a
+        re-parse adds no transactions the rest of the document is skipped.
+        
+        Returns:
+            Tuple of (transactions, metadata) from the text read so far
+        """
+        buf = io.StringIO()
+        transactions, metadata = [], {}
+        pending_pages = 0
+        
+        for page_text in pages:
+            buf.write(page_text)
+            if not page_text.strip():
+                continue
+            
+            pending_pages += 1
+            if pending_pages < cls.PDF_PLATEAU_PAGES:
+                continue
+            
+            pending_pages = 0
+            parsed, parsed_metadata = BankStatementParser.parse_text(buf.getvalue())
+            plateaued = bool(transactions) and len(parsed) <= len(transactions)
+            transactions, metadata = parsed, parsed_metadata
+            if plateaued:
+                return transactions, metadata
+        
+        if pending_pages:
+            transactions, metadata = BankStatementParser.parse_text(buf.getvalue())
+        return transactions, metadata
+    
+    @staticmethod
+    def _iter_pdfplumber_pages(pdf_path: str) -> Iterator[str]:
+        """Yield the PDF's text one page at a time using pdfplumber (best for text-based PDFs)"""
+        try:
+            import pdfplumber
+            
+            with pdfplumber.open(pdf_path) as pdf:
+                for page in pdf.pages:
+                    yield page.extract_text() or ""
+                    # Release the page's parsed layout before moving on
+                    page.flush_cache()
+        except ImportError:
+            logger.warning("pdfplumber not available")
+        except Exception as e:
+            logger.warning(f"Error extracting text with pdfplumber: {e}")
+    
+    @staticmethod
+    def _iter_pypdf2_pages(pdf_path: str) -> Iterator[str]:
+        """Yield the PDF's text one page at a time using PyPDF2"""
+        try:
+            import PyPDF2
+            
+            with open(pdf_path, 'rb') as f:
+                pdf_reader = PyPDF2.PdfReader(f)
+                for page in pdf_reader.pages:
+                    yield page.extract_text() or ""
+        except ImportError:
+            logger.warning("PyPDF2 not available")
+        except Exception as e:
+            logger.warning(f"Error extracting text with PyPDF2: {e}")
+    
+    @staticmethod
+    def _merge_tables(tables: List[pd.DataFrame]) -> List[pd.DataFrame]:
+        """Concatenate non-empty tables that share a header, keeping first-seen order
+        
+        A statement's transaction table is usually split across pages with the
+        same columns, so each group can be parsed in one vectorized pass.
+        """
+        groups: Dict[Tuple, List[pd.DataFrame]] = {}
+        for df in tables:
+            if not df.empty:
+                groups.setdefault(tuple(df.columns), []).append(df)
+        return [frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True) for frames in groups.values()]
+    
+    @staticmethod
+    def _attach_statement_metadata(transactions: List[Dict[str, Any]], metadata: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Attach statement metadata to each parsed transaction"""
+        if metadata and transactions:
+            # DO NOT process statement metadata here - it will be done in document_upload_page.py
+            # after the account type is set
+            
+            for transaction in transactions:
+                # Store metadata in additional_data for database storage
+                if 'additional_data' not in transaction:
+                    transaction['additional_data'] = {}
+                transaction['additional_data']['statement_metadata'] = metadata
+                
+                # Also keep it directly accessible for immediate use
+                transaction['statement_metadata'] = metadata
+        return transactions
+    
     @classmethod
     def _parse_csv(cls, file_obj: BinaryIO, document_type: str) -> List[Dict[str, Any]]:
         """Parse CSV document based on type"""
@@ -214,7 +285,7 @@ class DocumentParserService:
             file_obj.seek(0)
             
             # Read CSV
-            df = pd.read_csv(file_obj)
+            df = cls._read_csv(file_obj)
             
             if df.empty:
                 raise ValueError("No data found in the CSV file.")
@@ -234,6 +305,17 @@ class DocumentParserService:
             else:
                 raise ValueError(f"Error parsing CSV file: {str(e)}")
     
+    @staticmethod
+    def _read_csv(file_obj: BinaryIO) -> pd.DataFrame:
+        """Read a CSV with pandas' multithreaded pyarrow engine, falling back to the C engine"""
+        try:
+            return pd.read_csv(file_obj, engine='pyarrow')
+        except (ImportError, ValueError, TypeError) as e:
+            # pyarrow not installed, or the file uses something the pyarrow reader rejects
+            logger.info(f"pyarrow CSV engine unavailable, using default parser: {e}")
+            file_obj.seek(0)
+            return pd.read_csv(file_obj)
+    
     @classmethod
     def _parse_excel(cls, file_obj: BinaryIO, document_type: str) -> List[Dict[str, Any]]:
         """Parse Excel document based on type"""
@@ -265,13 +347,12 @@ class DocumentParserService:
     @classmethod
     def _parse_bank_statement_df(cls, df: pd.DataFrame) -> List[Dict[str, Any]]:
         """Parse bank statement DataFrame"""
-        transactions = []
-        
         try:
             # Try to identify columns
-            date_col = cls._find_column(df, ['date', 'transaction date', 'posted date'])
-            desc_col = cls._find_column(df, ['description', 'transaction', 'details', 'memo'])
-            amount_col = cls._find_column(df, ['amount', 'transaction amount'])
+            columns = cls._column_index(df)
+            date_col = cls._find_column(columns, ['date', 'transaction date', 'posted date'])
+            desc_col = cls._find_column(columns, ['description', 'transaction', 'details', 'memo'])
+            amount_col = cls._find_column(columns, ['amount', 'transaction amount'])
             
             if not all([date_col, desc_col, amount_col]):
                 # Use fallback for Bank of America statements
@@ -290,55 +371,50 @@ class DocumentParserService:
                 else:
                     raise ValueError("Could not identify required columns in the bank statement. Please check the file format.")
             
-            # Process each row
-            for _, row in df.iterrows():
-                try:
-                    # Parse date
-                    date_val = row[date_col]
-                    if isinstance(date_val, str):
-                        # Try common date formats
-                        for fmt in ['%m/%d/%Y', '%Y-%m-%d', '%d/%m/%Y']:
-                            try:
-                                date_obj = datetime.strptime(date_val, fmt)
-                                break
-                            except ValueError:
-                                continue
-                    else:
-                        # Assume pandas datetime
-                        date_obj = date_val
-                    
-                    date = date_obj.strftime('%Y-%m-%d')
-                    
-                    # Parse description
-                    description = str(row[desc_col]).strip()
-                    
-                    # Parse amount
-                    amount = float(row[amount_col])
-                    
-                    # Determine transaction type
-                    transaction_type = 'Income' if amount >= 0 else 'Expense'
-                    amount = abs(amount)  # Make amount positive
-                    
-                    # Create transaction with standard fields
-                    transaction = {
-                        'date': date,
-                        'description': description,
-                        'amount': amount,
-                        'type': transaction_type,
-                        'category': 'Uncategorized',
-                        'payment_method': 'Bank Transfer'
-                    }
-                    
-                    # Add all other columns as additional data
-                    for col in df.columns:
-                        if col not in [date_col, desc_col, amount_col] and not pd.isna(row[col]):
-                            # Convert any non-string values to string
-                            transaction[f'original_{col}'] = str(row[col])
-                    
-                    transactions.append(transaction)
-                except Exception as e:
-                    print(f"Error parsing row: {e}")
+            # Parse whole columns at once instead of row by row
+            dates = cls._parse_date_column(df[date_col])
+            amounts = pd.to_numeric(df[amount_col], errors='coerce')
+            
+            # Skip rows whose date or amount could not be parsed
+            valid = dates.notna() & amounts.notna()
+            skipped = int((~valid).sum())
+            if skipped:
+                logger.warning(f"Skipped {skipped} rows with unparseable date or amount")
+            df = df[valid]
+            dates = dates[valid].dt.strftime('%Y-%m-%d')
+            amounts = amounts[valid].astype('float64')
+            descriptions = df[desc_col].astype(str).str.strip()
             
+            # Determine transaction type from the sign, then make amounts positive
+            types = np.where(amounts.values >= 0, 'Income', 'Expense')
+            amounts = amounts.abs()
+            
+            # Add all other columns as additional data, as strings, leaving out empty cells
+            extra = df.drop(columns=[date_col, desc_col, amount_col])
+            extra = extra.astype(str).where(extra.notna()).add_prefix('original_')
+            # to_dict yields no records at all when there are no extra columns, so the
+            # zip below must not be cut short by it
+            extra_records = [
+                {key: value for key, value in record.items() if isinstance(value, str)}
+                for record in extra.to_dict(orient='records')
+            ] if len(extra.columns) else [{}] * len(df)
+            
+            # Create transactions with standard fields
+            transactions = [
+                {
+                    'date': date,
+                    'description': description,
+                    'amount': amount,
+                    'type': transaction_type,
+                    'category': 'Uncategorized',
+                    'payment_method': 'Bank Transfer',
+                    **additional
+                }
+                for date, description, amount, transaction_type, additional in zip(
+                    dates.tolist(), descriptions.tolist(), amounts.tolist(), types.tolist(), extra_records
+                )
+            ]
+    
             return transactions
         except Exception as e:
             if isinstance(e, ValueError):
@@ -346,6 +422,43 @@ class DocumentParserService:
             else:
                 raise ValueError(f"Error parsing bank statement: {str(e)}")
     
+    @classmethod
+    def _parse_date_column(cls, column: pd.Series) -> pd.Series:
+        """Parse a date column to datetime64, leaving NaT where no date can be read
+        
+        Text dates are tried against BANK_DATE_FORMATS in order, so an ambiguous value
+        such as 01/02/2025 resolves the same way as the row-by-row parser did. Whatever
+        is still unparsed is inferred value by value, day first (e.g. "05 Jan 2025").
+        """
+        if pd.api.types.is_datetime64_any_dtype(column):
+            return column
+        
+        is_text = column.map(lambda value: isinstance(value, str)).astype(bool)
+        # astype(str) keeps .str usable when no cell is text (numeric or all-NaN columns)
+        text = column[is_text].astype(str).str.strip()
+        parsed = pd.Series(pd.NaT, index=column.index, dtype='datetime64[ns]')
+        for fmt in cls.BANK_DATE_FORMATS:
+            missing = parsed.index[parsed.isna() & is_text]
+            if missing.empty:
+                break
+            parsed.loc[missing] = pd.to_datetime(text.loc[missing], format=fmt, errors='coerce')
+        
+        missing = parsed.index[parsed.isna() & is_text]
+        if not missing.empty:
+            with warnings.catch_warnings():
+                # pandas warns when it has to infer a format; leftovers are parsed one by one
+                # because a single call would infer the first value's format for all of them
+                warnings.simplefilter('ignore', UserWarning)
+                parsed.loc[missing] = text.loc[missing].map(lambda value: pd.to_datetime(value, dayfirst=True, errors='coerce'))
+        
+        # Only real date cells (e.g. from Excel) are converted; numbers and other
+        # values stay NaT rather than being read as epoch offsets
+        is_date = column.map(lambda value: isinstance(value, (date, np.datetime64))).astype(bool)
+        other = column.index[is_date]
+        if not other.empty:
+            parsed.loc[other] = pd.to_datetime(column.loc[other].tolist(), errors='coerce')
+        return parsed
+    
     @classmethod
     def _parse_credit_statement_df(cls, df: pd.DataFrame) -> List[Dict[str, Any]]:
         """Parse credit card statement DataFrame"""
@@ -359,76 +472,87 @@ class DocumentParserService:
         return []
     
     @staticmethod
-    def _find_column(df: pd.DataFrame, possible_names: List[str]) -> Optional[str]:
-        """Find a column in the DataFrame based on possible names"""
+    def _column_index(df: pd.DataFrame) -> Dict[str, Any]:
+        """Map lowercase column names to the DataFrame's columns, built once per statement
+        
+        When several columns differ only by case, the all-lowercase one wins so that an
+        exact match keeps precedence over a case-insensitive one.
+        """
+        columns = {}
+        for col in df.columns:
+            key = str(col).lower()
+            if key not in columns or col == key:
+                columns[key] = col
+        return columns
+    
+    @staticmethod
+    def _find_column(columns: Dict[str, Any], possible_names: List[str]) -> Optional[str]:
+        """Find a column based on possible names using an index from _column_index"""
         for name in possible_names:
-            # Check for exact match
-            if name in df.columns:
-                return name
+            name = name.lower()
             
-            # Check for case-insensitive match
-            for col in df.columns:
-                if name.lower() == col.lower():
-                    return col
+            # Check for exact or case-insensitive match
+            if name in columns:
+                return columns[name]
             
             # Check for partial match
-            for col in df.columns:
-                if name.lower() in col.lower():
+            for key, col in columns.items():
+                if name in key:
                     return col
         
         return None
     
-    @staticmethod
-    def _check_pdf_support() -> bool:
-        """Check if PDF parsing libraries are installed"""
+    @classmethod
+    def _check_pdf_support(cls) -> bool:
+        """Check if PDF parsing libraries are installed
+        
+        A positive result is remembered so find_spec only searches sys.path once. A negative
+        result is re-checked, because the libraries can be installed from the Upload
+        Documents page while the app is running.
+        """
+        if cls._pdf_support:
+            return True
+        
         try:
             import importlib.util
             
-            # Check for pdfplumber (preferred)
-            pdfplumber_spec = importlib.util.find_spec("pdfplumber")
-            if pdfplumber_spec is not None:
-                return True
-            
-            # Check for PyPDF2
-            pypdf2_spec = importlib.util.find_spec("PyPDF2")
-            if pypdf2_spec is None:
-                return False
-            
-            return True
+            # Check for pdfplumber (preferred), then PyPDF2
+            cls._pdf_support = (
+                importlib.util.find_spec("pdfplumber") is not None
+                or importlib.util.find_spec("PyPDF2") is not None
+            )
+            return cls._pdf_support
         except ImportError:
             return False
     
+    @staticmethod
+    def _missing_required_field(transaction: Dict[str, Any]) -> Optional[str]:
+        """Return the first required field that is missing or empty, or None if all are present"""
+        for field in ('date', 'amount', 'type'):
+            if not transaction.get(field):
+                return field
+        return None
+    
     @classmethod
-    def save_transactions_to_db(cls, transactions: List[Dict[str, Any]]) -> int:
+    def save_transactions_to_db(cls, transactions: List[Dict[str, Any]], user_id: str) -> int:
         """Save parsed transactions to the database"""
-        count = 0
-        errors = []
-        
         try:
-            for transaction in transactions:
+            # Validate every transaction in one pass, then partition on the result
+            checked = [(transaction, cls._missing_required_field(transaction)) for transaction in transactions]
+            valid_transactions = [transaction for transaction, missing in checked if missing is None]
+            errors = [f"Missing {missing} in transaction: {transaction}" for transaction, missing in checked if missing]
+            
+            # Add the whole statement to the database in a single transaction
+            count = 0
+            if valid_transactions:
                 try:
-                    # Validate transaction data
-                    if 'date' not in transaction or not transaction['date']:
-                        errors.append(f"Missing date in transaction: {transaction}")
-                        continue
-                        
-                    if 'amount' not in transaction or not transaction['amount']:
-                        errors.append(f"Missing amount in transaction: {transaction}")
-                        continue
-                        
-                    if 'type' not in transaction or not transaction['type']:
-                        errors.append(f"Missing type in transaction: {transaction}")
-                        continue
-                    
-                    # Add transaction to database
-                    DatabaseService.add_transaction(transaction)
-                    count += 1
+                    count = DatabaseService.add_transactions_bulk(valid_transactions, user_id)
                 except Exception as e:
-                    errors.append(f"Error saving transaction: {str(e)}")
+                    errors.append(f"Error saving transactions: {str(e)}")
             
             # If there were errors but some transactions were saved
             if errors and count > 0:
-                print(f"Saved {count} transactions with {len(errors)} errors: {errors}")
+                logger.info(f"Saved {count} transactions with {len(errors)} errors: {errors}")
             # If there were only errors and no transactions saved
             elif errors and count == 0:
                 error_msg = "\n".join(errors[:5])  # Show first 5 errors
@@ -439,4 +563,4 @@ class DocumentParserService:
             if isinstance(e, ValueError):
                 raise
             else:
-                raise Exception(f"Error saving transactions to database: {str(e)}")
\ No newline at end of file
+                raise Exception(f"Error saving transactions to database: {str(e)}")
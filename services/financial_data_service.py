@@ -1,43 +1,107 @@
-import json
 import os
 import logging
-from typing import List, Dict, Any, Optional
-from datetime import datetime, timedelta
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Tuple
+from datetime import date, timedelta
 from functools import lru_cache
 from services.database_service import DatabaseService
 
+# pandas is only needed to vectorize totals over large transaction lists
+try:
+    import pandas as pd
+except ImportError:
+    pd = None
+
+# AuthMiddleware needs Streamlit; without it (e.g. in tests) callers pass user_id explicitly
+try:
+    from utils.auth_middleware import AuthMiddleware
+except ImportError:
+    AuthMiddleware = None
+
 logger = logging.getLogger(__name__)
 
+# Types totalled by TransactionService.totals_by_type; anything else gets the trailing code
+_TOTAL_TYPES = ('Income', 'Expense', 'Tax', 'Investment', 'Transfer')
+_TYPE_CODES = {transaction_type: code for code, transaction_type in enumerate(_TOTAL_TYPES)}
+_OTHER_TYPE_CODE = len(_TOTAL_TYPES)
+
+@lru_cache(maxsize=1)
+def _compiled_sum_by_code():
+    """services._fast_agg.sum_by_code, or None without numba; imported on first use because numba is slow to load"""
+    try:
+        from services._fast_agg import sum_by_code
+    except ImportError:
+        return None
+    return sum_by_code
+
+def _amount_or_zero(value) -> float:
+    """Amount as float, treating missing or unparseable values as 0"""
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+def _resolve_user_id(user_id: str = None) -> str:
+    """Helper method to get user ID from auth middleware, shared by the services below"""
+    if user_id:
+        return user_id
+    if AuthMiddleware is None:
+        return 'default_user'
+    
+    # get_current_user_id already unwraps {'user_id': ...} session dicts, so no type dispatch here
+    current_user = AuthMiddleware.get_current_user_id()
+    return str(current_user) if current_user else 'default_user'
+
+@lru_cache(maxsize=1)
+def _month_year_for(day_ordinal: int) -> Tuple[str, int]:
+    """('MM', YYYY) of the given day, as stored in budget rows"""
+    day = date.fromordinal(day_ordinal)
+    return f"{day.month:02d}", day.year
+
+def _today_month_year() -> Tuple[str, int]:
+    """Current budget month and year from one clock read; recomputed only when the day changes"""
+    return _month_year_for(date.today().toordinal())
+
 class TransactionService:
     """Service for handling transaction data"""
     
-    @staticmethod
-    def _get_user_id(user_id: str = None) -> str:
-        """Helper method to get user ID from auth middleware"""
-        if user_id:
-            return user_id
-            
-        from utils.auth_middleware import AuthMiddleware
-        current_user = AuthMiddleware.get_current_user_id()
-        
-        if isinstance(current_user, dict) and 'user_id' in current_user:
-            return str(current_user['user_id'])
-        elif current_user:
-            return str(current_user)
-        else:
-            return 'default_user'
+    VECTORIZE_THRESHOLD = 2000  # Above this many rows totals_by_type sums with numba or pandas
+    
+    CACHE_TTL_SECONDS = 300  # How long loaded transactions and summaries are reused
+    CACHE_MAX_USERS = 64  # Least recently used users are evicted beyond this
+    SUMMARY_CACHE_MAX_ENTRIES = 256  # Least recently used summaries are evicted beyond this
+    
+    # Summary cache: (user_id, date_range, period) -> (monotonic time, summary); clear_cache drops a user's entries
+    _summary_cache: "OrderedDict[Tuple[str, str, str], Tuple[float, Dict[str, float]]]" = OrderedDict()
+    _summary_cache_lock = threading.Lock()
+    # Process-wide transaction cache shared by every session/tab: user_id -> (monotonic time, rows)
+    _transactions_cache: "OrderedDict[str, Tuple[float, List[Dict[str, Any]]]]" = OrderedDict()
+    _transactions_cache_lock = threading.Lock()
+    
+    _get_user_id = staticmethod(_resolve_user_id)
     
     @staticmethod
     def add_transaction(transaction: Dict[str, Any], user_id: str = None) -> int:
         """Add a transaction to the database"""
         user_id = TransactionService._get_user_id(user_id)
-        return DatabaseService.add_transaction(transaction, user_id)
+        transaction_id = DatabaseService.add_transaction(transaction, user_id)
+        TransactionService.clear_cache(user_id)
+        return transaction_id
     
     @staticmethod
-    def load_transactions(user_id: str = None, use_cache: bool = True) -> List[Dict[str, Any]]:
-        """Load all transactions from the database for a specific user with caching"""
+    def load_transactions(user_id: str = None, use_cache: bool = True, since: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Load all transactions from the database for a specific user with caching
+        
+        With ``since`` only transactions dated at or after it are read; these windowed
+        loads go straight to the database and bypass the full-history cache.
+        """
         user_id = TransactionService._get_user_id(user_id)
         
+        if since is not None:
+            return DatabaseService.get_transactions(user_id, since=since)
+        
         # Use cached version if available and recent
         if use_cache:
             cached_data = TransactionService._get_cached_transactions(user_id)
@@ -62,18 +126,18 @@ class TransactionService:
         Returns:
             List of cached transactions or None if cache is invalid/expired
         """
-        import streamlit as st
-        
-        cache_key = f"transactions_cache_{user_id}"
-        cache_time_key = f"transactions_cache_time_{user_id}"
-        
-        if cache_key in st.session_state and cache_time_key in st.session_state:
-            cache_time = st.session_state[cache_time_key]
-            # Cache valid for 5 minutes
-            if datetime.now() - cache_time < timedelta(minutes=5):
-                return st.session_state[cache_key]
-        
-        return None
+        with TransactionService._transactions_cache_lock:
+            entry = TransactionService._transactions_cache.get(user_id)
+            if entry is None:
+                return None
+            
+            cache_time, transactions = entry
+            if time.monotonic() - cache_time >= TransactionService.CACHE_TTL_SECONDS:
+                del TransactionService._transactions_cache[user_id]
+                return None
+            
+            TransactionService._transactions_cache.move_to_end(user_id)
+            return transactions
     
     @staticmethod
     def _cache_transactions(user_id: str, transactions: List[Dict[str, Any]]):
@@ -83,13 +147,12 @@ class TransactionService:
             user_id: The user identifier
             transactions: List of transaction data to cache
         """
-        import streamlit as st
-        
-        cache_key = f"transactions_cache_{user_id}"
-        cache_time_key = f"transactions_cache_time_{user_id}"
-        
-        st.session_state[cache_key] = transactions
-        st.session_state[cache_time_key] = datetime.now()
+        with TransactionService._transactions_cache_lock:
+            cache = TransactionService._transactions_cache
+            cache[user_id] = (time.monotonic(), transactions)
+            cache.move_to_end(user_id)
+            while len(cache) > TransactionService.CACHE_MAX_USERS:
+                cache.popitem(last=False)
     
     @staticmethod
     def clear_cache(user_id: str = None):
@@ -98,89 +161,139 @@ class TransactionService:
         Args:
             user_id: The user identifier (optional, will get from auth if not provided)
         """
-        import streamlit as st
-        
         user_id = TransactionService._get_user_id(user_id)
         
-        cache_key = f"transactions_cache_{user_id}"
-        cache_time_key = f"transactions_cache_time_{user_id}"
+        with TransactionService._transactions_cache_lock:
+            TransactionService._transactions_cache.pop(user_id, None)
         
-        if cache_key in st.session_state:
-            del st.session_state[cache_key]
-        if cache_time_key in st.session_state:
-            del st.session_state[cache_time_key]
+        with TransactionService._summary_cache_lock:
+            summaries = TransactionService._summary_cache
+            for key in [key for key in summaries if key[0] == user_id]:
+                del summaries[key]
     
     @staticmethod
-    @lru_cache(maxsize=128)
     def get_transaction_summary(user_id: str, date_range: str = "current_month") -> Dict[str, float]:
-        """Get optimized transaction summary with caching"""
-        transactions = TransactionService.load_transactions(user_id, use_cache=True)
+        """Get optimized transaction summary with caching
+        
+        Cached per user, date range and period for CACHE_TTL_SECONDS; add_transaction
+        and clear_cache drop the user's entries.
+        """
+        user_id = TransactionService._get_user_id(user_id)
         
-        # Filter by date range
+        # The period the range covers today, so entries roll over at month/day boundaries;
+        # ISO slicing instead of strftime, which goes through locale-aware formatting
         if date_range == "current_month":
-            current_month = datetime.now().strftime('%Y-%m')
-            filtered_transactions = [t for t in transactions if t.get('date', '').startswith(current_month)]
+            bucket = date.today().isoformat()[:7]
         elif date_range == "last_30_days":
-            cutoff_date = (datetime.now() - timedelta(days=30)).strftime('%Y-%m-%d')
-            filtered_transactions = [t for t in transactions if t.get('date', '') >= cutoff_date]
+            bucket = date.today().isoformat()
         else:
-            filtered_transactions = transactions
+            bucket = ''
+        
+        key = (user_id, date_range, bucket)
+        cache = TransactionService._summary_cache
+        with TransactionService._summary_cache_lock:
+            entry = cache.get(key)
+            if entry is not None and time.monotonic() - entry[0] < TransactionService.CACHE_TTL_SECONDS:
+                cache.move_to_end(key)
+                # Copy so callers can't mutate the cached dict
+                return dict(entry[1])
+        
+        summary = TransactionService._compute_summary(user_id, date_range, bucket)
+        
+        with TransactionService._summary_cache_lock:
+            cache[key] = (time.monotonic(), summary)
+            cache.move_to_end(key)
+            while len(cache) > TransactionService.SUMMARY_CACHE_MAX_ENTRIES:
+                cache.popitem(last=False)
+        return dict(summary)
+    
+    @staticmethod
+    def _compute_summary(user_id: str, date_range: str, bucket: str) -> Dict[str, float]:
+        """Compute the summary for one user, range and period"""
+        # Translate the date range into string bounds on the ISO date column
+        if date_range == "current_month":
+            # 'YYYY-(MM+1)' sorts after every date in the month, December included ('YYYY-13')
+            year, month = bucket.split('-')
+            start_date, end_date = bucket, f"{year}-{int(month) + 1:02d}"
+        elif date_range == "last_30_days":
+            start_date, end_date = (date.fromisoformat(bucket) - timedelta(days=30)).isoformat(), None
+        else:
+            start_date, end_date = None, None
+        
+        # Aggregate per type in SQL; at most one row per transaction type comes back
+        grouped = DatabaseService.get_transaction_type_totals(user_id, start_date, end_date)
+        
+        # One pass over the grouped rows fills the totals and the count together
+        totals = dict.fromkeys(_TOTAL_TYPES, 0.0)
+        transaction_count = 0
+        for transaction_type, row in grouped.items():
+            if transaction_type in totals:
+                totals[transaction_type] = row['total']
+            transaction_count += row['count']
         
-        # Calculate summary
         summary = {
-            'total_income': sum(float(t.get('amount', 0)) for t in filtered_transactions if t.get('type') == 'Income'),
-            'total_expenses': sum(float(t.get('amount', 0)) for t in filtered_transactions if t.get('type') == 'Expense'),
-            'total_taxes': sum(float(t.get('amount', 0)) for t in filtered_transactions if t.get('type') == 'Tax'),
-            'total_investments': sum(float(t.get('amount', 0)) for t in filtered_transactions if t.get('type') == 'Investment'),
-            'total_transfers': sum(float(t.get('amount', 0)) for t in filtered_transactions if t.get('type') == 'Transfer'),
-            'transaction_count': len(filtered_transactions)
+            'total_income': totals['Income'],
+            'total_expenses': totals['Expense'],
+            'total_taxes': totals['Tax'],
+            'total_investments': totals['Investment'],
+            'total_transfers': totals['Transfer'],
+            'transaction_count': transaction_count,
+            'net_cash_flow': totals['Income'] - totals['Expense'] - totals['Tax'] - totals['Investment'] - totals['Transfer']
         }
         
-        summary['net_cash_flow'] = summary['total_income'] - summary['total_expenses'] - summary['total_taxes'] - summary['total_investments'] - summary['total_transfers']
-        
         return summary
     
     @staticmethod
-    def get_statement_metadata(user_id: str = None) -> Optional[Dict[str, Any]]:
-        """Get the latest statement metadata from transactions"""
-        user_id = TransactionService._get_user_id(user_id)
+    def totals_by_type(transactions: List[Dict[str, Any]]) -> Dict[str, float]:
+        """Sum already-loaded transactions per type in a single pass
         
-        transactions = DatabaseService.get_transactions(user_id)
+        Returns:
+            Totals for Income, Expense, Tax, Investment and Transfer (0.0 when absent)
+        """
+        totals = dict.fromkeys(_TOTAL_TYPES, 0.0)
+        vectorize = len(transactions) > TransactionService.VECTORIZE_THRESHOLD
+        sum_by_code = _compiled_sum_by_code() if vectorize else None
+        
+        if sum_by_code is not None:
+            # Encode rows once into two arrays and reduce them in one compiled loop
+            sums = sum_by_code(
+                (_TYPE_CODES.get(t.get('type'), _OTHER_TYPE_CODE) for t in transactions),
+                (_amount_or_zero(t.get('amount')) for t in transactions),
+                len(transactions),
+                _OTHER_TYPE_CODE + 1,
+            )
+            for code, transaction_type in enumerate(_TOTAL_TYPES):
+                totals[transaction_type] = sums[code]
+            return totals
+        
+        if pd is not None and vectorize:
+            # Columnar groupby-sum runs in C instead of a Python loop per row
+            df = pd.DataFrame(transactions, columns=['type', 'amount'])
+            amounts = pd.to_numeric(df['amount'], errors='coerce').fillna(0.0)
+            # Group keys in order of appearance; only the five summary types are read back
+            grouped = amounts.groupby(df['type'], sort=False).sum().to_dict()
+            for transaction_type in totals:
+                totals[transaction_type] = float(grouped.get(transaction_type, 0.0))
+            return totals
         
-        # Look for statement metadata in transactions
         for transaction in transactions:
-            # Check if transaction has additional_data field
-            if 'additional_data' in transaction and transaction['additional_data']:
-                try:
-                    # Parse additional_data as JSON
-                    additional_data = json.loads(transaction['additional_data'])
-                    
-                    # Check if it contains statement_metadata
-                    if 'statement_metadata' in additional_data:
-                        return additional_data['statement_metadata']
-                except:
-                    pass
+            transaction_type = transaction.get('type')
+            if transaction_type in totals:
+                totals[transaction_type] += _amount_or_zero(transaction.get('amount'))
+        return totals
+    
+    @staticmethod
+    def get_statement_metadata(user_id: str = None) -> Optional[Dict[str, Any]]:
+        """Get the latest statement metadata from transactions"""
+        user_id = TransactionService._get_user_id(user_id)
         
-        return None
+        # Read from the dedicated column; migration 003 backfilled it from additional_data
+        return DatabaseService.get_latest_statement_metadata(user_id)
 
 class BudgetService:
     """Service for handling budget data"""
     
-    @staticmethod
-    def _get_user_id(user_id: str = None) -> str:
-        """Helper method to get user ID from auth middleware"""
-        if user_id:
-            return user_id
-            
-        from utils.auth_middleware import AuthMiddleware
-        current_user = AuthMiddleware.get_current_user_id()
-        
-        if isinstance(current_user, dict) and 'user_id' in current_user:
-            return str(current_user['user_id'])
-        elif current_user:
-            return str(current_user)
-        else:
-            return 'default_user'
+    _get_user_id = staticmethod(_resolve_user_id)
     
     @classmethod
     def save_budget(cls, budget_data: Dict[str, float], user_id: str = None) -> bool:
@@ -189,19 +302,14 @@ class BudgetService:
             user_id = cls._get_user_id(user_id)
             
             # Get current month and year
-            current_month = datetime.now().strftime('%m')
-            current_year = datetime.now().year
+            current_month, current_year = _today_month_year()
             
-            # Save each category as a budget item
-            for category, amount in budget_data.items():
-                budget_item = {
-                    'category': category,
-                    'amount': amount,
-                    'month': current_month,
-                    'year': current_year
-                }
-                
-                DatabaseService.add_budget(budget_item, user_id)
+            # Save every category as a budget item in one transaction
+            budget_items = [
+                {'category': category, 'amount': amount, 'month': current_month, 'year': current_year}
+                for category, amount in budget_data.items()
+            ]
+            DatabaseService.add_budgets_bulk(budget_items, user_id)
             
             return True
         except (ValueError, TypeError) as e:
@@ -219,8 +327,7 @@ class BudgetService:
             
             # Use provided month/year or default to current
             if not month or not year:
-                current_month = datetime.now().strftime('%m')
-                current_year = datetime.now().year
+                current_month, current_year = _today_month_year()
             else:
                 current_month = month
                 current_year = year
@@ -246,21 +353,21 @@ class NetWorthService:
     
     NETWORTH_FILE = 'networth.json'
     
-    @staticmethod
-    def _get_user_id(user_id: str = None) -> str:
-        """Helper method to get user ID from auth middleware"""
-        if user_id:
-            return user_id
-            
-        from utils.auth_middleware import AuthMiddleware
-        current_user = AuthMiddleware.get_current_user_id()
-        
-        if isinstance(current_user, dict) and 'user_id' in current_user:
-            return str(current_user['user_id'])
-        elif current_user:
-            return str(current_user)
-        else:
-            return 'default_user'
+    # Stored asset_type -> investments category; all bank accounts go into savings
+    ASSET_CATEGORIES = {
+        'checking': 'savings',
+        'savings': 'savings',
+        'money market': 'savings',
+        'stocks': 'stocks',
+        'retirement': 'retirement',
+        'hsa': 'hsa',
+        'precious_metals': 'precious_metals',
+    }
+    # Groups load_networth always returns, in display order
+    INVESTMENT_CATEGORIES = ('stocks', 'savings', 'retirement', 'hsa', 'precious_metals')
+    DEBT_TYPES = ('loans', 'credit_cards', 'mortgage')
+    
+    _get_user_id = staticmethod(_resolve_user_id)
     
     @classmethod
     def save_networth(cls, networth_data: Dict[str, Any], user_id: str = None) -> bool:
@@ -268,24 +375,12 @@ class NetWorthService:
         try:
             user_id = cls._get_user_id(user_id)
             
-            # Save investments
-            investments = networth_data.get('investments', {})
-            for asset_type, assets in investments.items():
-                for asset in assets:
-                    asset['asset_type'] = asset_type
-                    DatabaseService.add_asset(asset, user_id)
-            
-            # Save debts
-            debts = networth_data.get('debts', {})
-            for liability_type, liabilities in debts.items():
-                for liability in liabilities:
-                    liability['liability_type'] = liability_type
-                    DatabaseService.add_liability(liability, user_id)
-            
-            # Save real estate
-            real_estate = networth_data.get('real_estate', [])
-            for property in real_estate:
-                DatabaseService.add_real_estate(property, user_id)
+            # One executemany per table and one commit for all of them; each group's
+            # type is applied while building its rows instead of copied into every dict
+            with DatabaseService.transaction() as conn:
+                DatabaseService.add_assets_by_type(networth_data.get('investments', {}), user_id, conn=conn)
+                DatabaseService.add_liabilities_by_type(networth_data.get('debts', {}), user_id, conn=conn)
+                DatabaseService.add_real_estate_bulk(networth_data.get('real_estate', []), user_id, conn=conn)
             
             return True
         except (ValueError, TypeError, KeyError) as e:
@@ -301,55 +396,34 @@ class NetWorthService:
         try:
             user_id = cls._get_user_id(user_id)
             
+            # Load assets, liabilities and real estate in one connection checkout
+            bundle = DatabaseService.get_networth_bundle(user_id)
+            
+            # Scaffold is only built once the rows are in hand; real estate is the bundle's own list
+            investments = {category: [] for category in cls.INVESTMENT_CATEGORIES}
+            debts = {liability_type: [] for liability_type in cls.DEBT_TYPES}
             networth_data = {
-                'investments': {
-                    'stocks': [],
-                    'savings': [],
-                    'retirement': [],
-                    'hsa': [],
-                    'precious_metals': []
-                },
-                'debts': {
-                    'loans': [],
-                    'credit_cards': [],
-                    'mortgage': []
-                },
-                'real_estate': [],
-                'last_updated': datetime.now().strftime('%Y-%m-%d')
+                'investments': investments,
+                'debts': debts,
+                'real_estate': bundle['real_estate'],
+                'last_updated': date.today().isoformat()
             }
             
+            # The bundle's row dicts are built for this call, so the type keys are popped in place
+            # rather than copied away
+            
             # Load assets
-            assets = DatabaseService.get_assets(user_id)
-            for asset in assets:
-                asset_type = asset.get('asset_type')
-                
-                # Map account types to appropriate investment categories
-                if asset_type == 'checking' or asset_type == 'savings' or asset_type == 'money market':
-                    target_type = 'savings'  # All bank accounts go into savings category
-                else:
-                    target_type = asset_type
-                    
-                if target_type in networth_data['investments']:
-                    # Remove asset_type from the asset
-                    asset_copy = dict(asset)
-                    if 'asset_type' in asset_copy:
-                        del asset_copy['asset_type']
-                    networth_data['investments'][target_type].append(asset_copy)
+            for asset in bundle['assets']:
+                # Map account types to appropriate investment categories, skipping unknown ones
+                target_type = cls.ASSET_CATEGORIES.get(asset.pop('asset_type', None))
+                if target_type is not None:
+                    investments[target_type].append(asset)
             
             # Load liabilities
-            liabilities = DatabaseService.get_liabilities(user_id)
-            for liability in liabilities:
-                liability_type = liability.get('liability_type')
-                if liability_type in networth_data['debts']:
-                    # Remove liability_type from the liability
-                    liability_copy = dict(liability)
-                    if 'liability_type' in liability_copy:
-                        del liability_copy['liability_type']
-                    networth_data['debts'][liability_type].append(liability_copy)
-            
-            # Load real estate
-            real_estate = DatabaseService.get_real_estate(user_id)
-            networth_data['real_estate'] = real_estate
+            for liability in bundle['liabilities']:
+                liability_type = liability.pop('liability_type', None)
+                if liability_type in debts:
+                    debts[liability_type].append(liability)
             
             return networth_data
         except Exception as e:
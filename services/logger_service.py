@@ -1,59 +1,105 @@
+import atexit
 import logging
 import os
+import queue
+import threading
+import time
 from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from typing import Optional
 
+class _DailyLogFileHandler(RotatingFileHandler):
+    """Size-rotating handler that moves on to a new YYYY-MM-DD.log file when the day changes"""
+    
+    def __init__(self, logs_dir: str, **kwargs):
+        self._logs_dir = logs_dir
+        self._day = time.localtime().tm_yday
+        super().__init__(self._path_for_today(), **kwargs)
+    
+    def _path_for_today(self) -> str:
+        return os.path.join(self._logs_dir, f"{datetime.now().strftime('%Y-%m-%d')}.log")
+    
+    def emit(self, record):
+        # A cheap day-of-year check per record; the file name is only formatted when it changes
+        day = time.localtime(record.created).tm_yday
+        if day != self._day:
+            self._day = day
+            if self.stream:
+                self.stream.close()
+                self.stream = None  # Reopened at the new path by FileHandler.emit
+            self.baseFilename = self._path_for_today()
+        super().emit(record)
+
 class LoggerService:
     """Centralized logging service for the application"""
     
+    LOGS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'logs')
+    LOG_MAX_BYTES = 10 * 1024 * 1024  # Rotate the log file beyond this size
+    LOG_BACKUP_COUNT = 5
+    
     _loggers = {}
+    # One console and one file handler shared by every logger, fed from a queue by a single writer thread
+    _queue: Optional[queue.Queue] = None
+    _listener: Optional[QueueListener] = None
+    _lock = threading.Lock()
+    
+    @classmethod
+    def _get_queue(cls) -> queue.Queue:
+        """Start the shared handlers and their listener thread on first use"""
+        with cls._lock:
+            if cls._queue is not None:
+                return cls._queue
+            
+            # Create logs directory if it doesn't exist
+            os.makedirs(cls.LOGS_DIR, exist_ok=True)
+            
+            # Create handlers
+            console_handler = logging.StreamHandler()
+            console_handler.setLevel(logging.INFO)
+            
+            file_handler = _DailyLogFileHandler(
+                cls.LOGS_DIR,
+                maxBytes=cls.LOG_MAX_BYTES,
+                backupCount=cls.LOG_BACKUP_COUNT,
+                encoding='utf-8'
+            )
+            file_handler.setLevel(logging.DEBUG)
+            
+            # Set formatters
+            console_handler.setFormatter(logging.Formatter('%(levelname)s - %(message)s'))
+            file_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+            
+            cls._queue = queue.Queue(-1)
+            cls._listener = QueueListener(cls._queue, console_handler, file_handler, respect_handler_level=True)
+            cls._listener.start()
+            # Flush queued records before the interpreter exits
+            atexit.register(cls._listener.stop)
+            return cls._queue
     
     @classmethod
     def get_logger(cls, name: str) -> logging.Logger:
         """
         Get a logger instance by name
         
+        Log calls only enqueue the record; the shared listener thread formats and writes it.
+        
         Args:
             name: Logger name (usually module name)
-            
+        
         Returns:
             Logger instance
         """
         if name in cls._loggers:
             return cls._loggers[name]
         
-        # Create logs directory if it doesn't exist
-        logs_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'logs')
-        if not os.path.exists(logs_dir):
-            os.makedirs(logs_dir)
-        
         # Create logger
         logger = logging.getLogger(name)
         logger.setLevel(logging.DEBUG)
-        
-        # Create handlers
-        console_handler = logging.StreamHandler()
-        console_handler.setLevel(logging.INFO)
-        
-        file_handler = logging.FileHandler(
-            os.path.join(logs_dir, f"{datetime.now().strftime('%Y-%m-%d')}.log"),
-            encoding='utf-8'
-        )
-        file_handler.setLevel(logging.DEBUG)
-        
-        # Create formatters
-        console_format = logging.Formatter('%(levelname)s - %(message)s')
-        file_format = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-        
-        # Set formatters
-        console_handler.setFormatter(console_format)
-        file_handler.setFormatter(file_format)
-        
-        # Add handlers
-        logger.addHandler(console_handler)
-        logger.addHandler(file_handler)
+        logger.addHandler(QueueHandler(cls._get_queue()))
+        # The shared handlers already write every record; don't repeat it through the root logger
+        logger.propagate = False
         
         # Store logger
         cls._loggers[name] = logger
         
-        return logger
\ No newline at end of file
+        return logger
@@ -2,13 +2,51 @@
 Database migration service for schema changes
 """
 import sqlite3
+import json
 import logging
 import re
-from typing import List, Dict
+import threading
+from typing import List, Tuple
 from config.constants import DatabaseConstants
 
+__all__ = ['MigrationService']
+
 logger = logging.getLogger(__name__)
 
+# cysimdjson can read one key of a large JSON document without building the whole
+# object; the parser instance is reused so its buffers are allocated once
+try:
+    import cysimdjson
+    _json_parser = cysimdjson.JSONParser()
+except ImportError:
+    _json_parser = None
+
+def _extract_statement_metadata(additional_data: str):
+    """Return additional_data's top-level statement_metadata value, or None if absent or malformed"""
+    if _json_parser is not None:
+        try:
+            value = _json_parser.parse(additional_data.encode()).at_pointer('/statement_metadata')
+        except (KeyError, ValueError, TypeError):
+            return None
+        # Objects and arrays come back as parser views; scalars are plain Python values
+        return value.export() if hasattr(value, 'export') else value
+    
+    try:
+        return json.loads(additional_data).get('statement_metadata')
+    except (ValueError, AttributeError):
+        # Malformed or non-object JSON carries no usable metadata
+        return None
+
+# Migration 003 backfill done by SQLite's JSON1 in C; malformed JSON is skipped via json_valid,
+# and only non-empty objects are copied, as the parser always produces
+_SQL_BACKFILL_STATEMENT_METADATA = (
+    "UPDATE transactions SET statement_metadata_json = json_extract(additional_data, '$.statement_metadata') "
+    "WHERE statement_metadata_json IS NULL AND instr(additional_data, 'statement_metadata') > 0 "
+    "AND CASE WHEN json_valid(additional_data) "
+    "THEN json_type(additional_data, '$.statement_metadata') = 'object' "
+    "AND json_extract(additional_data, '$.statement_metadata') != '{}' ELSE 0 END"
+)
+
 # Allowed tables for migration operations (security whitelist)
 ALLOWED_MIGRATION_TABLES = {'transactions', 'budget', 'assets', 'liabilities', 'real_estate'}
 
@@ -18,29 +56,77 @@ IDENT_RE = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
 # Dangerous SQL keywords that must be blocked (comprehensive list)
 DANGEROUS_KEYWORDS = re.compile(r'\b(DROP|ATTACH|DETACH|PRAGMA|BEGIN|COMMIT|ALTER\s+TABLE|DELETE|INSERT|UPDATE|CREATE|EXEC|SELECT|WITH|TRIGGER|VACUUM|VALUES|REPLACE)\b', re.IGNORECASE)
 
+# The single-word keywords above as a set, checked against a definition's words; only a
+# definition containing ALTER still needs the regex to tell ALTER TABLE apart
+DANGEROUS_WORDS = frozenset({
+    'DROP', 'ATTACH', 'DETACH', 'PRAGMA', 'BEGIN', 'COMMIT', 'DELETE', 'INSERT', 'UPDATE',
+    'CREATE', 'EXEC', 'SELECT', 'WITH', 'TRIGGER', 'VACUUM', 'VALUES', 'REPLACE',
+})
+WORD_RE = re.compile(r'\w+')
+
+# Statement separators and comment markers, found in a single scan
+DANGEROUS_SEQUENCES = re.compile(r';|--|/\*|\*/')
+
 # Allowed SQL data types (whitelist)
 ALLOWED_TYPES = {'TEXT', 'INTEGER', 'REAL', 'BLOB', 'NUMERIC'}
 
 # Allowed constraints (whitelist)
-ALLOWED_CONSTRAINTS = {'NOT NULL', 'NULL', 'UNIQUE', 'PRIMARY KEY', 'DEFAULT'}
+ALLOWED_CONSTRAINTS = {'NOT NULL', 'NULL', 'UNIQUE', 'PRIMARY KEY', 'DEFAULT', 'CHECK'}
+
+# Longest column definition accepted; bounds the work the checks below can be made to do
+MAX_COLUMN_DEFINITION_LENGTH = 512
 
 # Safe column definition pattern (handles quotes, brackets, and constraints)
-COLUMN_DEF_PATTERN = re.compile(r'^\s*([`"\[]?\w+[`"\]]?)\s+(TEXT|INTEGER|REAL|BLOB|NUMERIC)(?:\s+(NOT\s+NULL|NULL|UNIQUE|PRIMARY\s+KEY|DEFAULT\s+["\']?[^;]*["\']?))*\s*$', re.IGNORECASE)
+COLUMN_DEF_PATTERN = re.compile(r'^\s*([`"\[]?\w+[`"\]]?)\s+(TEXT|INTEGER|REAL|BLOB|NUMERIC)(?:\s+(NOT\s+NULL|NULL|UNIQUE|PRIMARY\s+KEY|CHECK\s*\([^;]*\)|DEFAULT\s+["\']?[^;]*["\']?))*\s*$', re.IGNORECASE)
 
 class MigrationService:
     """Handles database schema migrations"""
     
     DB_FILE = DatabaseConstants.DB_FILE
+    ALLOWED_TABLES = frozenset(ALLOWED_MIGRATION_TABLES)
+    
+    # One connection per thread, shared by every step of a migration run until close()
+    _local = threading.local()
+    # journal_mode is stored in the database file, so it only needs setting once per file
+    _wal_files = set()
     
     @classmethod
     def get_connection(cls):
-        """Get database connection"""
+        """Get this thread's migration connection, opening it on first use"""
+        conn = getattr(cls._local, 'conn', None)
+        if conn is not None and cls._local.db_file == cls.DB_FILE:
+            return conn
+        
+        cls.close()
         conn = sqlite3.connect(cls.DB_FILE)
         conn.row_factory = sqlite3.Row
+        # WAL with NORMAL sync fsyncs far less for the DDL and backfills below; the sort and
+        # temp b-trees built by the backfill stay in memory alongside a larger page cache
+        if cls.DB_FILE not in cls._wal_files:
+            try:
+                conn.execute('PRAGMA journal_mode = WAL')
+                cls._wal_files.add(cls.DB_FILE)
+            except sqlite3.OperationalError as e:
+                # Read-only or network file systems may refuse WAL; migrate in the default journal mode
+                logger.warning(f"Could not enable WAL for migrations: {e}")
+        conn.execute('PRAGMA synchronous = NORMAL')
+        conn.execute('PRAGMA temp_store = MEMORY')
+        conn.execute('PRAGMA cache_size = -64000')
+        cls._local.conn, cls._local.db_file = conn, cls.DB_FILE
         return conn
     
     @classmethod
-    def _ensure_table_allowed(cls, table_name: str):
+    def close(cls):
+        """Close this thread's migration connection, if one is open"""
+        cls._local.schema = None
+        cls._local.applied = None
+        conn = getattr(cls._local, 'conn', None)
+        if conn is not None:
+            cls._local.conn = None
+            conn.close()
+    
+    @classmethod
+    def _validate_table_name(cls, table_name: str):
         """Validate table name against whitelist and identifier rules"""
         if not table_name:
             logger.warning(f"Migration security: Empty table name rejected")
@@ -69,26 +155,48 @@ class MigrationService:
             logger.warning(f"Migration security: Empty column definition rejected")
             raise ValueError("column_definition is required")
         
+        # Cheapest checks first: length, then the whitelist shape, then the keyword scans
+        if len(column_definition) > MAX_COLUMN_DEFINITION_LENGTH:
+            logger.warning(f"Migration security: Column definition rejected (too long)")
+            raise ValueError(f"Column definition longer than {MAX_COLUMN_DEFINITION_LENGTH} characters")
+        
         # Use whitelist pattern matching instead of blacklist
         if not COLUMN_DEF_PATTERN.match(column_definition):
             logger.warning(f"Migration security: Column definition rejected (invalid format)")
             raise ValueError(f"Column definition must follow pattern: column_name TYPE [constraints]. Allowed types: {ALLOWED_TYPES}")
         
-        # Ensure definition starts with the correct column name
-        col_pattern = re.compile(r'^\s*[`"\[]?' + re.escape(column_name) + r'[`"\]]?\b', re.IGNORECASE)
-        if not col_pattern.match(column_definition):
+        # Ensure definition starts with the correct column name; COLUMN_DEF_PATTERN has already fixed
+        # the shape, so plain slicing past an optional opening quote is enough
+        name = column_definition.lstrip()
+        if name[:1] in ('"', '`', '['):
+            name = name[1:]
+        tail = name[len(column_name):len(column_name) + 1]
+        if name[:len(column_name)].lower() != column_name.lower() or not (tail in ('"', '`', ']') or tail.isspace()):
             logger.warning(f"Migration security: Column definition rejected (wrong column name)")
             raise ValueError(f"Column definition must start with column name '{column_name}'")
         
         # Additional safety: block any remaining dangerous patterns
-        if ';' in column_definition or '--' in column_definition or '/*' in column_definition:
+        if DANGEROUS_SEQUENCES.search(column_definition):
             logger.warning(f"Migration security: Column definition rejected (dangerous characters)")
             raise ValueError("Dangerous characters not allowed in column definition")
         
-        if DANGEROUS_KEYWORDS.search(column_definition):
+        words = set(WORD_RE.findall(column_definition.upper()))
+        if not DANGEROUS_WORDS.isdisjoint(words) or ('ALTER' in words and DANGEROUS_KEYWORDS.search(column_definition)):
             logger.warning(f"Migration security: Column definition rejected (dangerous keywords)")
             raise ValueError("Dangerous SQL keywords not allowed in column definition")
     
+    @classmethod
+    def validate_add_column(cls, table_name: str, column_name: str, column_definition: str) -> bool:
+        """Run every check add_column_if_not_exists applies, without touching the database
+        
+        Returns:
+            True if the column could be added; raises ValueError otherwise
+        """
+        cls._validate_table_name(table_name)
+        cls._validate_column_name(column_name)
+        cls._validate_column_definition(column_name, column_definition)
+        return True
+    
     @classmethod
     def initialize_migrations_table(cls):
         """Create migrations tracking table"""
@@ -104,19 +212,28 @@ class MigrationService:
         ''')
         
         conn.commit()
-        conn.close()
+    
+    @classmethod
+    def _applied_versions(cls) -> set:
+        """Versions in schema_migrations, read once per connection and kept current by _record_applied"""
+        conn = cls.get_connection()
+        applied = getattr(cls._local, 'applied', None)
+        if applied is None:
+            applied = {row[0] for row in conn.execute('SELECT version FROM schema_migrations')}
+            cls._local.applied = applied
+        return applied
+    
+    @classmethod
+    def _record_applied(cls, version: str):
+        """Note a version whose schema_migrations row was just committed"""
+        applied = getattr(cls._local, 'applied', None)
+        if applied is not None:
+            applied.add(version)
     
     @classmethod
     def is_migration_applied(cls, version: str) -> bool:
         """Check if migration version is already applied"""
-        conn = cls.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('SELECT 1 FROM schema_migrations WHERE version = ?', (version,))
-        result = cursor.fetchone()
-        conn.close()
-        
-        return result is not None
+        return version in cls._applied_versions()
     
     @classmethod
     def apply_migration(cls, version: str, migration_sql: str):
@@ -139,30 +256,43 @@ class MigrationService:
             )
             
             conn.commit()
+            cls._record_applied(version)
             logger.info(f"Applied migration {version}")
             
         except Exception as e:
             conn.rollback()
             logger.error(f"Failed to apply migration {version}: {e}")
             raise
-        finally:
-            conn.close()
+    
+    @classmethod
+    def _table_columns(cls, table_name: str) -> set:
+        """Lower-cased column names of table_name, read once per connection until a column is added to it"""
+        conn = cls.get_connection()
+        schema = getattr(cls._local, 'schema', None)
+        if schema is None:
+            schema = cls._local.schema = {}
+        key = table_name.lower()
+        columns = schema.get(key)
+        if columns is None:
+            # Use quoted identifier for safety
+            columns = {column[1].lower() for column in conn.execute(f'PRAGMA table_info("{table_name}")')}
+            schema[key] = columns
+        return columns
+    
+    @classmethod
+    def _forget_columns(cls, table_name: str):
+        """Drop table_name's cached columns after altering it"""
+        schema = getattr(cls._local, 'schema', None)
+        if schema is not None:
+            schema.pop(table_name.lower(), None)
     
     @classmethod
     def column_exists(cls, table_name: str, column_name: str) -> bool:
         """Check if column exists in table"""
-        cls._ensure_table_allowed(table_name)
+        cls._validate_table_name(table_name)
         cls._validate_column_name(column_name)
         
-        conn = cls.get_connection()
-        cursor = conn.cursor()
-        
-        # Use quoted identifier for safety
-        cursor.execute(f'PRAGMA table_info("{table_name}")')
-        columns = [column[1].lower() for column in cursor.fetchall()]
-        conn.close()
-        
-        return column_name.lower() in columns
+        return column_name.lower() in cls._table_columns(table_name)
     
     @classmethod
     def _build_safe_column_definition(cls, column_name: str, data_type: str, constraints: str = None) -> str:
@@ -187,9 +317,7 @@ class MigrationService:
     @classmethod
     def add_column_if_not_exists(cls, table_name: str, column_name: str, column_definition: str):
         """Add column only if it doesn't exist"""
-        cls._ensure_table_allowed(table_name)
-        cls._validate_column_name(column_name)
-        cls._validate_column_definition(column_name, column_definition)
+        cls.validate_add_column(table_name, column_name, column_definition)
         
         if not cls.column_exists(table_name, column_name):
             conn = cls.get_connection()
@@ -200,50 +328,132 @@ class MigrationService:
                 safe_sql = f'ALTER TABLE "{table_name}" ADD COLUMN {column_definition}'
                 cursor.execute(safe_sql)
                 conn.commit()
+                cls._forget_columns(table_name)
                 logger.info(f"Added column {column_name} to {table_name}")
             except Exception as e:
                 conn.rollback()
                 logger.error(f"Failed to add column {column_name} to {table_name}: {e}")
                 raise
-            finally:
-                conn.close()
         else:
             logger.info(f"Column {column_name} already exists in {table_name}")
     
+    @classmethod
+    def _add_missing_columns(cls, cursor, columns: List[Tuple[str, str, str]]) -> int:
+        """ALTER in each column not yet in the schema, inside the caller's open transaction
+        
+        Returns:
+            Number of columns added
+        """
+        for table_name, column_name, column_definition in columns:
+            cls.validate_add_column(table_name, column_name, column_definition)
+        
+        # One PRAGMA table_info per table, all on the shared connection
+        missing = [column for column in columns if not cls.column_exists(column[0], column[1])]
+        for table_name, column_name, column_definition in missing:
+            cursor.execute(f'ALTER TABLE "{table_name}" ADD COLUMN {column_definition}')
+            cls._forget_columns(table_name)
+        return len(missing)
+    
+    @classmethod
+    def add_columns_if_not_exist(cls, columns: List[Tuple[str, str, str]], version: str = None):
+        """Add the missing columns in one transaction
+        
+        Args:
+            columns: (table_name, column_name, column_definition) tuples, validated like add_column_if_not_exists
+            version: Migration recorded as applied in the same transaction, if given
+        """
+        conn = cls.get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            # Explicit BEGIN so every ALTER and the version row share a single commit
+            cursor.execute('BEGIN')
+            added = cls._add_missing_columns(cursor, columns)
+            if version:
+                cursor.execute('INSERT OR IGNORE INTO schema_migrations (version) VALUES (?)', (version,))
+            conn.commit()
+            if version:
+                cls._record_applied(version)
+            logger.info(f"Added {added} of {len(columns)} columns")
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Failed to add columns: {e}")
+            raise
+    
     @classmethod
     def run_all_migrations(cls):
-        """Run all pending migrations"""
+        """Run all pending migrations on one connection, closed once the run ends"""
+        try:
+            cls._run_pending_migrations()
+        finally:
+            cls.close()
+    
+    @classmethod
+    def _run_pending_migrations(cls):
+        """Apply each migration not yet recorded in schema_migrations, all in one transaction"""
         cls.initialize_migrations_table()
         
-        # Migration 001: Add user_id columns
-        if not cls.is_migration_applied('001_add_user_id_columns'):
-            cls.add_column_if_not_exists('transactions', 'user_id', 'user_id TEXT DEFAULT "default_user"')
-            cls.add_column_if_not_exists('budget', 'user_id', 'user_id TEXT DEFAULT "default_user"')
-            cls.add_column_if_not_exists('assets', 'user_id', 'user_id TEXT DEFAULT "default_user"')
-            cls.add_column_if_not_exists('liabilities', 'user_id', 'user_id TEXT DEFAULT "default_user"')
-            cls.add_column_if_not_exists('real_estate', 'user_id', 'user_id TEXT DEFAULT "default_user"')
+        conn = cls.get_connection()
+        cursor = conn.cursor()
+        applied_now = []
+        
+        try:
+            # Take the write lock up front; every pending migration and its version row share one commit
+            cursor.execute('BEGIN IMMEDIATE')
             
-            # Mark migration as applied
-            conn = cls.get_connection()
-            cursor = conn.cursor()
-            cursor.execute('INSERT OR IGNORE INTO schema_migrations (version) VALUES (?)', ('001_add_user_id_columns',))
+            # Migration 001: Add user_id columns
+            if not cls.is_migration_applied('001_add_user_id_columns'):
+                cls._add_missing_columns(cursor, [
+                    (table_name, 'user_id', 'user_id TEXT DEFAULT "default_user"')
+                    for table_name in ('transactions', 'budget', 'assets', 'liabilities', 'real_estate')
+                ])
+                applied_now.append('001_add_user_id_columns')
+            
+            # Migration 002: Normalize payment methods
+            if not cls.is_migration_applied('002_normalize_payment_methods'):
+                # Both renames in one pass over the table
+                cursor.execute(
+                    "UPDATE transactions SET payment_method = CASE payment_method "
+                    "WHEN 'Cheque' THEN 'Check' WHEN 'Debit Card' THEN 'Credit Card' END "
+                    "WHERE payment_method IN ('Cheque', 'Debit Card')"
+                )
+                applied_now.append('002_normalize_payment_methods')
+            
+            # Migration 003: Copy statement metadata out of additional_data into its own column
+            if not cls.is_migration_applied('003_statement_metadata_column'):
+                cls._add_missing_columns(cursor, [('transactions', 'statement_metadata_json', 'statement_metadata_json TEXT')])
+                try:
+                    cursor.execute(_SQL_BACKFILL_STATEMENT_METADATA)
+                    backfilled = cursor.rowcount
+                except sqlite3.OperationalError:
+                    # SQLite built without JSON1: parse each candidate row in Python instead
+                    cursor.execute(
+                        "SELECT id, additional_data FROM transactions "
+                        "WHERE statement_metadata_json IS NULL AND instr(additional_data, 'statement_metadata') > 0"
+                    )
+                    rows = []
+                    for transaction_id, additional_data in cursor.fetchall():
+                        metadata = _extract_statement_metadata(additional_data)
+                        if metadata:
+                            rows.append((json.dumps(metadata), transaction_id))
+                    
+                    cursor.executemany('UPDATE transactions SET statement_metadata_json = ? WHERE id = ?', rows)
+                    backfilled = len(rows)
+                logger.info(f"Backfilled statement metadata for {backfilled} rows")
+                applied_now.append('003_statement_metadata_column')
+            
+            cursor.executemany(
+                'INSERT OR IGNORE INTO schema_migrations (version) VALUES (?)',
+                [(version,) for version in applied_now]
+            )
             conn.commit()
-            conn.close()
+        except Exception as e:
+            conn.rollback()
+            # Columns read inside the rolled-back transaction may no longer exist
+            cls._local.schema = None
+            logger.error(f"Failed to apply pending migrations: {e}")
+            raise
         
-        # Migration 002: Normalize payment methods
-        if not cls.is_migration_applied('002_normalize_payment_methods'):
-            conn = cls.get_connection()
-            cursor = conn.cursor()
-            
-            try:
-                cursor.execute("UPDATE transactions SET payment_method = 'Check' WHERE payment_method = 'Cheque'")
-                cursor.execute("UPDATE transactions SET payment_method = 'Credit Card' WHERE payment_method = 'Debit Card'")
-                cursor.execute('INSERT OR IGNORE INTO schema_migrations (version) VALUES (?)', ('002_normalize_payment_methods',))
-                conn.commit()
-                logger.info("Applied migration 002_normalize_payment_methods")
-            except Exception as e:
-                conn.rollback()
-                logger.error(f"Failed to apply migration 002_normalize_payment_methods: {e}")
-                raise
-            finally:
-                conn.close()
\ No newline at end of file
+        for version in applied_now:
+            cls._record_applied(version)
+            logger.info(f"Applied migration {version}")
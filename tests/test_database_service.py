@@ -0,0 +1,556 @@
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from services import database_service
+from services.database_service import DatabaseService
+from services.migration_service import MigrationService
+
+
+class DatabaseServiceTestCase(unittest.TestCase):
+    def setUp(self):
+        fd, self.db_path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        self.audit_db_path = self.db_path[:-3] + '_audit.db'
+        self._original_db_files = (DatabaseService.DB_FILE, DatabaseService.AUDIT_DB_FILE, MigrationService.DB_FILE)
+        DatabaseService.DB_FILE = self.db_path
+        DatabaseService.AUDIT_DB_FILE = self.audit_db_path
+        MigrationService.DB_FILE = self.db_path
+        DatabaseService.initialize_database()
+
+    def tearDown(self):
+        DatabaseService.close_pool()
+        DatabaseService.DB_FILE, DatabaseService.AUDIT_DB_FILE, MigrationService.DB_FILE = self._original_db_files
+        for path in (self.db_path, self.audit_db_path):
+            for suffix in ('', '-wal', '-shm'):
+                if os.path.exists(path + suffix):
+                    os.unlink(path + suffix)
+
+    def _add(self, amount, user_id='alice', date='2025-01-15', type_='Expense'):
+        return DatabaseService.add_transaction(
+            {'date': date, 'amount': amount, 'type': type_, 'description': f'tx {amount}'},
+            user_id,
+        )
+
+
+class TestBulkDelete(DatabaseServiceTestCase):
+    def test_bulk_delete_only_removes_own_transactions(self):
+        own = [self._add(i) for i in range(1, 6)]
+        other = self._add(99, user_id='bob')
+
+        deleted = DatabaseService.bulk_delete_transactions(own[:3] + [other], 'alice')
+
+        self.assertEqual(deleted, 3)
+        self.assertEqual(len(DatabaseService.get_transactions('alice')), 2)
+        self.assertEqual(len(DatabaseService.get_transactions('bob')), 1)
+
+    def test_bulk_delete_writes_audit_entries(self):
+        ids = [self._add(i) for i in range(1, 4)]
+
+        DatabaseService.bulk_delete_transactions(ids, 'alice')
+
+        audit = DatabaseService.get_audit_log('alice')
+        self.assertEqual(sorted(entry['record_id'] for entry in audit), sorted(ids))
+
+    def test_bulk_delete_handles_more_ids_than_parameter_limit(self):
+        ids = [self._add(i) for i in range(1, 4)]
+        missing = list(range(10_000, 10_000 + DatabaseService.MAX_SQL_VARIABLES))
+
+        self.assertEqual(DatabaseService.bulk_delete_transactions(missing + ids, 'alice'), 3)
+
+    def test_bulk_delete_empty_list(self):
+        self.assertEqual(DatabaseService.bulk_delete_transactions([], 'alice'), 0)
+
+
+class TestInsertReturning(DatabaseServiceTestCase):
+    def test_add_transaction_returns_id_by_default(self):
+        self.assertIsInstance(self._add(5), int)
+
+    def test_add_transaction_can_return_stored_row(self):
+        row = DatabaseService.add_transaction(
+            {'date': '2025-01-15', 'amount': 5.0, 'type': 'Expense'}, 'alice', return_row=True
+        )
+
+        self.assertEqual(row['user_id'], 'alice')
+        self.assertEqual(row['category'], 'Other')
+        self.assertIsNotNone(row['created_at'])
+        self.assertEqual(DatabaseService.get_transactions('alice')[0]['id'], row['id'])
+
+    def test_add_asset_can_return_stored_row(self):
+        row = DatabaseService.add_asset({'name': 'Savings', 'value': 100.0}, 'alice', return_row=True)
+
+        self.assertEqual(row['owner'], 'Joint')
+        self.assertEqual(row['value'], 100.0)
+
+
+class TestBulkInsert(DatabaseServiceTestCase):
+    def test_add_transactions_bulk_inserts_all_rows(self):
+        transactions = [
+            {'date': '2025-02-01', 'amount': 10.0, 'type': 'Expense', 'merchant': 'Cafe'},
+            {'date': '2025-02-02', 'amount': 2000.0, 'type': 'Income'},
+        ]
+
+        self.assertEqual(DatabaseService.add_transactions_bulk(transactions, 'alice'), 2)
+
+        stored = DatabaseService.get_transactions('alice')
+        self.assertEqual(len(stored), 2)
+        by_date = {t['date']: t for t in stored}
+        self.assertEqual(by_date['2025-02-02']['category'], 'Other')
+        self.assertIn('Cafe', by_date['2025-02-01']['additional_data'])
+        self.assertIsNone(by_date['2025-02-02']['additional_data'])
+
+    def test_add_transactions_bulk_rejects_incomplete_rows(self):
+        with self.assertRaises(ValueError):
+            DatabaseService.add_transactions_bulk(
+                [{'date': '2025-02-01', 'amount': 10.0, 'type': 'Expense'}, {'date': '2025-02-02'}],
+                'alice',
+            )
+        self.assertEqual(DatabaseService.get_transactions('alice'), [])
+
+    def test_add_budgets_bulk_updates_existing_and_inserts_new(self):
+        DatabaseService.add_budget({'category': 'Food', 'amount': 100, 'month': '05', 'year': 2025}, 'alice')
+
+        written = DatabaseService.add_budgets_bulk([
+            {'category': 'Food', 'amount': 150, 'month': '05', 'year': 2025},
+            {'category': 'Rent', 'amount': 900, 'month': '05', 'year': 2025},
+            {'category': 'Rent', 'amount': 950, 'month': '05', 'year': 2025},
+            {'category': '', 'amount': 10, 'month': '05', 'year': 2025},
+        ], 'alice')
+
+        self.assertEqual(written, 2)
+        budget = {item['category']: item['amount'] for item in DatabaseService.get_budget('05', 2025, 'alice')}
+        self.assertEqual(budget, {'Food': 150, 'Rent': 950})
+
+    def test_networth_bulk_inserts_share_one_transaction(self):
+        with DatabaseService.transaction() as conn:
+            DatabaseService.add_assets_bulk([{'name': 'Brokerage', 'value': 10}, {'name': 'HSA', 'value': 5}], 'alice', conn=conn)
+            DatabaseService.add_liabilities_bulk([{'name': 'Card', 'value': 2}], 'alice', conn=conn)
+            DatabaseService.add_real_estate_bulk([{'name': 'Home', 'current_value': 300}], 'alice', conn=conn)
+
+        self.assertEqual([a['name'] for a in DatabaseService.get_assets('alice')], ['Brokerage', 'HSA'])
+        self.assertEqual(len(DatabaseService.get_liabilities('alice')), 1)
+        self.assertEqual(DatabaseService.get_real_estate('alice')[0]['purchase_value'], 0)
+
+    def test_asset_type_argument_leaves_input_untouched(self):
+        asset = {'name': 'Brokerage', 'value': 10}
+
+        DatabaseService.add_assets_bulk([asset], 'alice', asset_type='stocks')
+        DatabaseService.add_liability({'name': 'Card', 'value': 2, 'liability_type': 'loans'}, 'alice', liability_type='credit_cards')
+
+        self.assertEqual(asset, {'name': 'Brokerage', 'value': 10})
+        self.assertEqual(DatabaseService.get_assets('alice')[0]['asset_type'], 'stocks')
+        self.assertEqual(DatabaseService.get_liabilities('alice')[0]['liability_type'], 'credit_cards')
+
+    def test_by_type_bulk_inserts_stamp_each_group(self):
+        written = DatabaseService.add_assets_by_type(
+            {'stocks': [{'name': 'Index fund', 'value': 1}], 'hsa': [{'name': 'HSA', 'value': 2}, {'name': 'HSA 2', 'value': 3}]},
+            'alice',
+        )
+        DatabaseService.add_liabilities_by_type({'loans': [{'name': 'Car', 'value': 4}], 'mortgage': []}, 'alice')
+
+        self.assertEqual(written, 3)
+        self.assertEqual({a['name']: a['asset_type'] for a in DatabaseService.get_assets('alice')},
+                         {'Index fund': 'stocks', 'HSA': 'hsa', 'HSA 2': 'hsa'})
+        self.assertEqual([l['liability_type'] for l in DatabaseService.get_liabilities('alice')], ['loans'])
+
+    def test_get_networth_bundle_reads_all_three_tables(self):
+        DatabaseService.add_asset({'name': 'Brokerage', 'value': 10}, 'alice')
+        DatabaseService.add_liability({'name': 'Card', 'value': 2}, 'alice')
+        DatabaseService.add_real_estate({'name': 'Home', 'current_value': 300}, 'bob')
+
+        bundle = DatabaseService.get_networth_bundle('alice')
+
+        self.assertEqual([a['name'] for a in bundle['assets']], ['Brokerage'])
+        self.assertEqual([l['name'] for l in bundle['liabilities']], ['Card'])
+        self.assertEqual(bundle['real_estate'], [])
+
+
+class TestTransactionReads(DatabaseServiceTestCase):
+    def test_iter_transactions_streams_newest_first(self):
+        for day in (3, 1, 2):
+            self._add(day, date=f'2025-03-0{day}')
+
+        dates = [t['date'] for t in DatabaseService.iter_transactions('alice')]
+
+        self.assertEqual(dates, ['2025-03-03', '2025-03-02', '2025-03-01'])
+
+    def test_get_transactions_paginates(self):
+        for day in range(1, 6):
+            self._add(day, date=f'2025-03-0{day}')
+
+        page = DatabaseService.get_transactions('alice', limit=2, offset=1)
+
+        self.assertEqual([t['date'] for t in page], ['2025-03-04', '2025-03-03'])
+
+    def test_get_transactions_raw_returns_rows(self):
+        self._add(7)
+
+        rows = DatabaseService.get_transactions('alice', raw=True)
+
+        self.assertIsInstance(rows[0], sqlite3.Row)
+        self.assertEqual(rows[0]['amount'], 7)
+        self.assertEqual(dict(rows[0]), DatabaseService.get_transactions('alice')[0])
+
+    def test_get_transactions_since_bounds_the_window(self):
+        for day in (1, 15, 28):
+            self._add(day, date=f'2025-02-{day:02d}')
+        self._add(99, date='2025-01-31')
+
+        self.assertEqual([t['amount'] for t in DatabaseService.get_transactions('alice', since='2025-02')], [28, 15, 1])
+        self.assertEqual([t['amount'] for t in DatabaseService.get_transactions('alice', since='2025-02-10', limit=1)], [28])
+
+    def test_get_transactions_without_user_returns_nothing(self):
+        self._add(1)
+        self.assertEqual(DatabaseService.get_transactions(None), [])
+
+    def test_get_transaction_type_totals_groups_by_type_within_range(self):
+        self._add(10, date='2025-04-30')
+        self._add(20, date='2025-05-01')
+        self._add(5, date='2025-05-31')
+        self._add(1000, date='2025-05-15', type_='Income')
+        self._add(99, user_id='bob', date='2025-05-10')
+
+        totals = DatabaseService.get_transaction_type_totals('alice', '2025-05', '2025-06')
+
+        self.assertEqual(totals, {'Expense': {'total': 25.0, 'count': 2}, 'Income': {'total': 1000.0, 'count': 1}})
+        self.assertEqual(DatabaseService.get_transaction_type_totals('alice')['Expense']['count'], 3)
+
+    def test_type_totals_are_served_by_covering_index(self):
+        with DatabaseService._borrow() as conn:
+            plan = ' '.join(row[3] for row in conn.execute(
+                'EXPLAIN QUERY PLAN SELECT type, SUM(CAST(amount AS REAL)), COUNT(*) FROM transactions '
+                'WHERE user_id = ? AND date >= ? AND date < ? GROUP BY type', ('alice', '2025-05', '2025-06')))
+
+        self.assertIn('COVERING INDEX idx_tx_user_date_type', plan)
+
+    def test_latest_statement_metadata_reads_dedicated_column(self):
+        for day, bank in ((1, 'Old Bank'), (9, 'New Bank')):
+            DatabaseService.add_transaction(
+                {'date': f'2025-03-0{day}', 'amount': day, 'type': 'Expense', 'statement_metadata': {'bank': bank}},
+                'alice',
+            )
+        self._add(5, date='2025-03-20')
+
+        self.assertEqual(DatabaseService.get_latest_statement_metadata('alice'), {'bank': 'New Bank'})
+        self.assertIsNone(DatabaseService.get_latest_statement_metadata('bob'))
+
+    def test_latest_statement_metadata_uses_partial_index(self):
+        with DatabaseService._borrow() as conn:
+            plan = ' '.join(row[3] for row in conn.execute(
+                'EXPLAIN QUERY PLAN SELECT statement_metadata_json FROM transactions WHERE user_id = ? '
+                'AND statement_metadata_json IS NOT NULL ORDER BY date DESC LIMIT 1', ('alice',)))
+
+        self.assertIn('idx_tx_user_statement_metadata', plan)
+
+    def test_statement_metadata_migration_backfills_legacy_rows(self):
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute('DROP INDEX idx_tx_user_statement_metadata')
+            conn.execute('ALTER TABLE transactions DROP COLUMN statement_metadata_json')
+            conn.execute(
+                "INSERT INTO transactions (date, amount, type, additional_data, user_id) VALUES ('2025-03-01', 1, 'Expense', ?, 'alice')",
+                (json.dumps({'statement_metadata': {'bank': 'Legacy Bank'}}),),
+            )
+            # Newer rows that mention the key but carry nothing usable are left alone
+            conn.executemany(
+                "INSERT INTO transactions (date, amount, type, additional_data, user_id) VALUES ('2025-03-02', 1, 'Expense', ?, 'alice')",
+                [('{"statement_metadata": {',), (json.dumps({'statement_metadata': {}}),)],
+            )
+        DatabaseService.close_pool()
+
+        DatabaseService.initialize_database()
+
+        self.assertEqual(DatabaseService.get_latest_statement_metadata('alice'), {'bank': 'Legacy Bank'})
+
+    def test_payment_method_migration_renames_in_one_update(self):
+        with sqlite3.connect(self.db_path) as conn:
+            conn.executemany(
+                "INSERT INTO transactions (date, amount, type, payment_method, user_id) VALUES ('2025-03-01', 1, 'Expense', ?, 'alice')",
+                [('Cheque',), ('Debit Card',), ('Cash',)],
+            )
+            conn.execute("DELETE FROM schema_migrations WHERE version = '002_normalize_payment_methods'")
+
+        MigrationService.run_all_migrations()
+
+        with sqlite3.connect(self.db_path) as conn:
+            methods = [row[0] for row in conn.execute('SELECT payment_method FROM transactions ORDER BY id')]
+        self.assertEqual(methods, ['Check', 'Credit Card', 'Cash'])
+
+    def test_migration_run_shares_one_connection_and_closes_it(self):
+        conn = MigrationService.get_connection()
+        self.assertIs(MigrationService.get_connection(), conn)
+
+        MigrationService.run_all_migrations()
+
+        self.assertIsNone(MigrationService._local.conn)
+        self.assertIsNot(MigrationService.get_connection(), conn)
+        MigrationService.close()
+
+    def test_column_exists_reads_schema_once_per_connection(self):
+        self.assertTrue(MigrationService.column_exists('transactions', 'user_id'))
+        schema = MigrationService._local.schema
+        self.assertFalse(MigrationService.column_exists('budget', 'missing_column'))
+        self.assertIs(MigrationService._local.schema, schema)
+
+        MigrationService.add_column_if_not_exists('budget', 'missing_column', 'missing_column TEXT')
+
+        # Only the altered table is read again
+        transactions_columns = schema['transactions']
+        self.assertNotIn('budget', schema)
+        self.assertTrue(MigrationService.column_exists('budget', 'missing_column'))
+        self.assertIs(schema['transactions'], transactions_columns)
+        MigrationService.close()
+        self.assertIsNone(MigrationService._local.schema)
+
+    def test_applied_versions_are_read_once_and_kept_current(self):
+        self.assertFalse(MigrationService.is_migration_applied('test_scratch_table'))
+        applied = MigrationService._local.applied
+
+        MigrationService.apply_migration('test_scratch_table', 'CREATE TABLE IF NOT EXISTS scratch (x TEXT);')
+
+        self.assertIs(MigrationService._local.applied, applied)
+        self.assertTrue(MigrationService.is_migration_applied('test_scratch_table'))
+        MigrationService.close()
+        self.assertTrue(MigrationService.is_migration_applied('test_scratch_table'))
+        MigrationService.close()
+
+    def test_add_columns_if_not_exist_records_version_with_columns(self):
+        MigrationService.add_columns_if_not_exist([
+            ('assets', 'note', 'note TEXT'),
+            ('budget', 'note', 'note TEXT'),
+            ('assets', 'user_id', 'user_id TEXT'),
+        ], version='test_add_notes')
+
+        self.assertTrue(MigrationService.column_exists('assets', 'note'))
+        self.assertTrue(MigrationService.column_exists('budget', 'note'))
+        self.assertTrue(MigrationService.is_migration_applied('test_add_notes'))
+        MigrationService.close()
+
+
+class TestAuditDatabase(DatabaseServiceTestCase):
+    def test_audit_rows_are_written_to_separate_file(self):
+        DatabaseService.delete_transaction(self._add(5), 'alice')
+
+        self.assertEqual(len(DatabaseService.get_audit_log('alice')), 1)
+        with sqlite3.connect(self.audit_db_path) as audit_conn:
+            self.assertEqual(audit_conn.execute('SELECT COUNT(*) FROM audit_log').fetchone()[0], 1)
+        with sqlite3.connect(self.db_path) as main_conn:
+            tables = {row[0] for row in main_conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        self.assertNotIn('audit_log', tables)
+
+    def test_audit_queries_use_indexes(self):
+        with sqlite3.connect(self.audit_db_path) as audit_conn:
+            plans = {
+                sql: ' '.join(row[-1] for row in audit_conn.execute(f'EXPLAIN QUERY PLAN {sql}', params))
+                for sql, params in (
+                    ('SELECT * FROM audit_log WHERE user_id = ? ORDER BY timestamp DESC LIMIT ?', ('alice', 100)),
+                    ('SELECT * FROM undo_snapshots WHERE user_id = ? AND expires_at >= ? ORDER BY created_at DESC', ('alice', '2025-01-01')),
+                    ('DELETE FROM undo_snapshots WHERE expires_at < ?', ('2025-01-01',)),
+                )
+            }
+
+        for sql, plan in plans.items():
+            self.assertIn('USING INDEX', plan, sql)
+            self.assertNotIn('TEMP B-TREE', plan, sql)
+
+    def test_legacy_audit_rows_move_to_audit_database(self):
+        with sqlite3.connect(self.audit_db_path) as audit_conn:
+            audit_conn.execute('DROP TABLE audit_log')
+        with sqlite3.connect(self.db_path) as main_conn:
+            main_conn.execute(
+                'CREATE TABLE audit_log (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id TEXT NOT NULL, action TEXT NOT NULL, '
+                'table_name TEXT NOT NULL, record_id INTEGER, old_data TEXT, new_data TEXT, timestamp TEXT DEFAULT CURRENT_TIMESTAMP)'
+            )
+            main_conn.execute("INSERT INTO audit_log (user_id, action, table_name, record_id) VALUES ('alice', 'DELETE', 'transactions', 7)")
+
+        DatabaseService.initialize_database()
+
+        self.assertEqual([entry['record_id'] for entry in DatabaseService.get_audit_log('alice')], [7])
+
+    def test_bulk_delete_commits_audit_rows_with_the_delete(self):
+        DatabaseService.bulk_delete_transactions([self._add(1), self._add(2)], 'alice')
+
+        with sqlite3.connect(self.audit_db_path) as audit_conn:
+            self.assertEqual(audit_conn.execute('SELECT COUNT(*) FROM audit_log').fetchone()[0], 2)
+
+    def test_audit_entries_without_connection_are_written_immediately(self):
+        DatabaseService._log_audit_actions_bulk([('alice', 'UPDATE', 'assets', 1, None, {'value': 1})])
+
+        with sqlite3.connect(self.audit_db_path) as audit_conn:
+            self.assertEqual(audit_conn.execute('SELECT COUNT(*) FROM audit_log').fetchone()[0], 1)
+
+
+class TestUndoSnapshots(DatabaseServiceTestCase):
+    def test_restore_deleted_transaction_from_snapshot(self):
+        tx_id = self._add(42)
+        stored = DatabaseService.get_transactions('alice')[0]
+        snapshot_data = {k: stored[k] for k in ('date', 'amount', 'type', 'description', 'category', 'payment_method')}
+        snapshot_id = DatabaseService.create_undo_snapshot('alice', 'DELETE_TRANSACTION', snapshot_data)
+        DatabaseService.delete_transaction(tx_id, 'alice')
+
+        self.assertEqual([s['id'] for s in DatabaseService.get_undo_snapshots('alice')], [snapshot_id])
+        self.assertTrue(DatabaseService.restore_from_undo(snapshot_id, 'alice'))
+
+        restored = DatabaseService.get_transactions('alice')
+        self.assertEqual([t['amount'] for t in restored], [42])
+        self.assertEqual(DatabaseService.get_undo_snapshots('alice'), [])
+
+    def test_expired_snapshots_are_hidden_then_purged(self):
+        live_id = DatabaseService.create_undo_snapshot('alice', 'DELETE_TRANSACTION', {'amount': 1})
+        expired_id = DatabaseService.create_undo_snapshot('alice', 'DELETE_TRANSACTION', {'amount': 2})
+        with sqlite3.connect(self.audit_db_path) as audit_conn:
+            audit_conn.execute("UPDATE undo_snapshots SET expires_at = '2000-01-01T00:00:00' WHERE id = ?", (expired_id,))
+
+        self.assertEqual([s['id'] for s in DatabaseService.get_undo_snapshots('alice')], [live_id])
+        self.assertEqual(DatabaseService.purge_expired_undo_snapshots(), 1)
+        with sqlite3.connect(self.audit_db_path) as audit_conn:
+            remaining = [row[0] for row in audit_conn.execute('SELECT id FROM undo_snapshots')]
+        self.assertEqual(remaining, [live_id])
+
+    def test_create_undo_snapshots_bulk(self):
+        created = DatabaseService.create_undo_snapshots_bulk([
+            ('alice', 'DELETE_TRANSACTION', {'amount': 1}),
+            ('alice', 'DELETE_TRANSACTION', {'amount': 2}),
+            ('bob', 'DELETE_TRANSACTION', {'amount': 3}),
+        ])
+
+        self.assertEqual(created, 3)
+        self.assertEqual(len(DatabaseService.get_undo_snapshots('alice')), 2)
+        self.assertEqual(len(DatabaseService.get_undo_snapshots('bob')), 1)
+
+    def test_restore_bulk_delete_snapshot(self):
+        transactions = [
+            {'date': f'2025-04-0{day}', 'amount': day, 'type': 'Expense', 'description': f'tx {day}'}
+            for day in range(1, 4)
+        ]
+        snapshot_id = DatabaseService.create_undo_snapshot('alice', 'BULK_DELETE_TRANSACTIONS', {'transactions': transactions})
+
+        self.assertTrue(DatabaseService.restore_from_undo(snapshot_id, 'alice'))
+
+        restored = DatabaseService.get_transactions('alice')
+        self.assertEqual([t['date'] for t in restored], ['2025-04-03', '2025-04-02', '2025-04-01'])
+
+    @unittest.skipIf(database_service.msgpack is None, 'msgpack not installed')
+    def test_snapshot_with_numpy_values(self):
+        # Rows taken from a DataFrame carry numpy scalars
+        data = {'date': '2025-05-02', 'amount': np.float64(12.5), 'type': 'Expense', 'id': np.int64(9)}
+        snapshot_id = DatabaseService.create_undo_snapshot('alice', 'DELETE_TRANSACTION', data)
+
+        self.assertTrue(DatabaseService.restore_from_undo(snapshot_id, 'alice'))
+        self.assertEqual([t['amount'] for t in DatabaseService.get_transactions('alice')], [12.5])
+
+    def test_restore_legacy_json_snapshot(self):
+        expires_at = (datetime.now() + timedelta(hours=1)).isoformat()
+        with sqlite3.connect(self.audit_db_path) as audit_conn:
+            snapshot_id = audit_conn.execute(
+                'INSERT INTO undo_snapshots (user_id, action, data, expires_at) VALUES (?, ?, ?, ?)',
+                ('alice', 'DELETE_TRANSACTION', json.dumps({'date': '2025-05-01', 'amount': 7, 'type': 'Expense'}), expires_at)
+            ).lastrowid
+        # Startup re-encodes legacy TEXT payloads when msgpack is available
+        DatabaseService.initialize_database()
+
+        self.assertTrue(DatabaseService.restore_from_undo(snapshot_id, 'alice'))
+        self.assertEqual([t['amount'] for t in DatabaseService.get_transactions('alice')], [7])
+
+    def test_restore_corrupted_snapshot_fails(self):
+        snapshot_id = DatabaseService.create_undo_snapshot('alice', 'DELETE_TRANSACTION', {'amount': 1})
+        with sqlite3.connect(self.audit_db_path) as audit_conn:
+            audit_conn.execute("UPDATE undo_snapshots SET data = 'not json' WHERE id = ?", (snapshot_id,))
+
+        self.assertFalse(DatabaseService.restore_from_undo(snapshot_id, 'alice'))
+        self.assertEqual(DatabaseService.get_transactions('alice'), [])
+        # The failed restore rolls back, so the snapshot is still there
+        self.assertEqual([s['id'] for s in DatabaseService.get_undo_snapshots('alice')], [snapshot_id])
+
+    def test_restore_is_scoped_to_snapshot_owner(self):
+        snapshot_id = DatabaseService.create_undo_snapshot('alice', 'DELETE_TRANSACTION', {'date': '2025-05-01', 'amount': 3, 'type': 'Expense'})
+
+        self.assertFalse(DatabaseService.restore_from_undo(snapshot_id, 'bob'))
+        self.assertTrue(DatabaseService.restore_from_undo(snapshot_id, 'alice'))
+        self.assertFalse(DatabaseService.restore_from_undo(snapshot_id, 'alice'))
+        self.assertEqual([t['amount'] for t in DatabaseService.get_transactions('alice')], [3])
+
+
+class TestConnectionPool(DatabaseServiceTestCase):
+    def test_sequential_calls_reuse_one_connection(self):
+        self._add(1)
+        DatabaseService.get_assets('alice')
+        DatabaseService.get_transactions('alice')
+
+        self.assertEqual(DatabaseService._pool.qsize(), 1)
+
+    def test_pool_is_rebuilt_when_database_file_changes(self):
+        DatabaseService.get_assets('alice')
+        stale_pool = DatabaseService._pool
+        fd, other_path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        try:
+            DatabaseService.DB_FILE = other_path
+            with DatabaseService._borrow():
+                pass
+
+            self.assertIsNot(DatabaseService._pool, stale_pool)
+            self.assertEqual(stale_pool.qsize(), 0)
+        finally:
+            DatabaseService.close_pool()
+            DatabaseService.DB_FILE = self.db_path
+            for suffix in ('', '-wal', '-shm'):
+                if os.path.exists(other_path + suffix):
+                    os.unlink(other_path + suffix)
+
+
+class TestTransactionContext(DatabaseServiceTestCase):
+    def test_transaction_commits_grouped_writes(self):
+        with DatabaseService.transaction() as conn:
+            DatabaseService.add_asset({'name': 'Savings', 'value': 100.0}, 'alice', conn=conn)
+            DatabaseService.add_liability({'name': 'Card', 'value': 50.0}, 'alice', conn=conn)
+
+        self.assertEqual(len(DatabaseService.get_assets('alice')), 1)
+        self.assertEqual(len(DatabaseService.get_liabilities('alice')), 1)
+
+    def test_transaction_rolls_back_on_error(self):
+        with self.assertRaises(RuntimeError):
+            with DatabaseService.transaction() as conn:
+                DatabaseService.add_asset({'name': 'Savings', 'value': 100.0}, 'alice', conn=conn)
+                raise RuntimeError('boom')
+
+        self.assertEqual(DatabaseService.get_assets('alice'), [])
+
+
+class TestStatements(DatabaseServiceTestCase):
+    STATEMENT = {
+        'bank_name': 'Chase', 'account_number': '1234', 'account_type': 'Checking',
+        'statement_month': 1, 'statement_year': 2025, 'processed_date': '2025-02-01',
+    }
+
+    def test_add_statement_returns_existing_id_on_reprocess(self):
+        first = DatabaseService.add_statement(self.STATEMENT)
+        second = DatabaseService.add_statement({**self.STATEMENT, 'processed_date': '2025-03-01'})
+
+        self.assertGreater(first, 0)
+        self.assertEqual(first, second)
+        statements = DatabaseService.get_statements()
+        self.assertEqual(len(statements), 1)
+        self.assertEqual(statements[0]['processed_date'], '2025-03-01')
+
+
+class TestUserPreferences(DatabaseServiceTestCase):
+    def test_preference_round_trip_is_per_user(self):
+        self.assertTrue(DatabaseService.save_user_preference('theme', {'mode': 'dark'}, 'alice'))
+
+        self.assertEqual(DatabaseService.get_user_preference('theme', 'alice'), {'mode': 'dark'})
+        self.assertEqual(DatabaseService.get_user_preference('theme', 'bob', 'light'), 'light')
+
+
+if __name__ == "__main__":
+    unittest.main()
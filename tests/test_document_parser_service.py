@@ -0,0 +1,157 @@
+import sys
+import unittest
+from datetime import datetime
+from pathlib import Path
+from unittest import mock
+
+import pandas as pd
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from services.bank_statement_parser import BankStatementParser
+from services.document_parser_service import DocumentParserService
+
+
+class TestBankStatementDataFrame(unittest.TestCase):
+    def _parse(self, df):
+        return DocumentParserService._parse_bank_statement_df(df)
+
+    def test_ambiguous_date_uses_first_matching_format(self):
+        df = pd.DataFrame({'Date': ['01/02/2025'], 'Description': ['Coffee'], 'Amount': [-4.5]})
+
+        [transaction] = self._parse(df)
+
+        self.assertEqual(transaction['date'], '2025-01-02')
+        self.assertEqual(transaction['type'], 'Expense')
+        self.assertEqual(transaction['amount'], 4.5)
+
+    def test_day_first_fallback_for_unlisted_formats(self):
+        df = pd.DataFrame({'Date': ['05 Jan 2025', '13.02.2025'], 'Description': ['a', 'b'], 'Amount': [1, 2]})
+
+        self.assertEqual([t['date'] for t in self._parse(df)], ['2025-01-05', '2025-02-13'])
+
+    def test_unparseable_rows_are_skipped(self):
+        df = pd.DataFrame({
+            'Date': ['2025-01-01', 'not a date', '2025-01-03'],
+            'Description': ['ok', 'bad date', 'bad amount'],
+            'Amount': [10, 20, 'abc'],
+        })
+
+        with self.assertLogs('services.document_parser_service', 'WARNING') as logs:
+            transactions = self._parse(df)
+
+        self.assertEqual([t['description'] for t in transactions], ['ok'])
+        self.assertIn('Skipped 2 rows', logs.output[0])
+
+    def test_excel_datetime_column(self):
+        df = pd.DataFrame({
+            'Date': pd.to_datetime(['2025-03-01', '2025-03-02']),
+            'Description': ['Salary', 'Rent'],
+            'Amount': [2500, -1200],
+        })
+
+        transactions = self._parse(df)
+
+        self.assertEqual([t['date'] for t in transactions], ['2025-03-01', '2025-03-02'])
+        self.assertEqual([t['type'] for t in transactions], ['Income', 'Expense'])
+
+    def test_mixed_object_column_keeps_date_cells_only(self):
+        df = pd.DataFrame({
+            'Date': [datetime(2025, 4, 1), 20250402, '04/03/2025'],
+            'Description': ['a', 'b', 'c'],
+            'Amount': [1, 2, 3],
+        })
+
+        self.assertEqual([t['date'] for t in self._parse(df)], ['2025-04-01', '2025-04-03'])
+
+    def test_numeric_first_column_yields_no_rows(self):
+        # A tabula table without recognizable headers falls back to positional columns
+        df = pd.DataFrame({0: [1.0, 2.0], 1: ['x', 'y'], 2: [3.0, 4.0]})
+
+        self.assertEqual(self._parse(df), [])
+
+    def test_extra_columns_are_kept_as_original_strings(self):
+        df = pd.DataFrame({
+            'Date': ['2025-01-01', '2025-01-02'],
+            'Description': ['a', 'b'],
+            'Amount': [1, 2],
+            'Balance': [100.5, None],
+            'Ref': ['X1', 'X2'],
+        })
+
+        first, second = self._parse(df)
+
+        self.assertEqual(first['original_Balance'], '100.5')
+        self.assertEqual(first['original_Ref'], 'X1')
+        self.assertNotIn('original_Balance', second)
+        self.assertEqual(second['original_Ref'], 'X2')
+
+
+class TestPdfTextParsing(unittest.TestCase):
+    def setUp(self):
+        # One transaction per 'TX' token in the text read so far
+        self.parsed_texts = []
+        patcher = mock.patch.object(BankStatementParser, 'parse_text', side_effect=self._fake_parse_text)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _fake_parse_text(self, text):
+        self.parsed_texts.append(text)
+        count = text.count('TX')
+        return [{'amount': i} for i in range(count)], {'pages_seen': count}
+
+    def _pages(self, *pages):
+        consumed = []
+
+        def iterator():
+            for page in pages:
+                consumed.append(page)
+                yield page
+
+        return iterator(), consumed
+
+    def test_stops_after_a_reparse_adds_no_transactions(self):
+        pages, consumed = self._pages(*['TX'] * 4, *['footer'] * 10)
+
+        transactions, _ = DocumentParserService._parse_page_stream(pages)
+
+        self.assertEqual(len(transactions), 4)
+        # Re-parsed at pages 3, 6 and 9; page 9's re-parse added nothing so reading stopped
+        self.assertEqual(len(self.parsed_texts), 3)
+        self.assertEqual(len(consumed), 9)
+
+    def test_leftover_pages_get_a_final_reparse(self):
+        pages, _ = self._pages('TX', '', 'TX', 'TX', 'TX')
+
+        transactions, metadata = DocumentParserService._parse_page_stream(pages)
+
+        self.assertEqual(len(transactions), 4)
+        self.assertEqual(metadata, {'pages_seen': 4})
+        self.assertEqual(len(self.parsed_texts), 2)
+
+    def test_falls_back_to_pypdf2_when_pdfplumber_finds_no_transactions(self):
+        plumber_pages, _ = self._pages('scanned', 'scanned')
+        pypdf2_pages, _ = self._pages('TX', 'TX')
+
+        with mock.patch.object(DocumentParserService, '_iter_pdfplumber_pages', return_value=plumber_pages), \
+                mock.patch.object(DocumentParserService, '_iter_pypdf2_pages', return_value=pypdf2_pages):
+            transactions, _ = DocumentParserService._parse_pdf_text('statement.pdf')
+
+        self.assertEqual(len(transactions), 2)
+
+    def test_pypdf2_not_read_when_pdfplumber_finds_transactions(self):
+        plumber_pages, _ = self._pages('TX')
+        pypdf2_pages, pypdf2_consumed = self._pages('TX', 'TX')
+
+        with mock.patch.object(DocumentParserService, '_iter_pdfplumber_pages', return_value=plumber_pages), \
+                mock.patch.object(DocumentParserService, '_iter_pypdf2_pages', return_value=pypdf2_pages):
+            transactions, _ = DocumentParserService._parse_pdf_text('statement.pdf')
+
+        self.assertEqual(len(transactions), 1)
+        self.assertEqual(pypdf2_consumed, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,180 @@
+import sys
+import unittest
+from datetime import datetime, timedelta
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from services.database_service import DatabaseService
+from services.financial_data_service import NetWorthService, TransactionService
+from tests.test_database_service import DatabaseServiceTestCase
+
+
+class TestTransactionSummary(DatabaseServiceTestCase):
+    def setUp(self):
+        super().setUp()
+        TransactionService._summary_cache.clear()
+        TransactionService._transactions_cache.clear()
+        self.today = datetime.now().strftime('%Y-%m-%d')
+
+    def _add(self, amount, user_id='alice', date=None, type_='Expense'):
+        return TransactionService.add_transaction(
+            {'date': date or self.today, 'amount': amount, 'type': type_},
+            user_id,
+        )
+
+    def test_summary_totals_current_month(self):
+        self._add(40)
+        self._add(1000, type_='Income')
+        self._add(25, date='2000-01-01')
+
+        summary = TransactionService.get_transaction_summary('alice')
+
+        self.assertEqual(summary['total_expenses'], 40)
+        self.assertEqual(summary['total_income'], 1000)
+        self.assertEqual(summary['transaction_count'], 2)
+        self.assertEqual(summary['net_cash_flow'], 960)
+        self.assertEqual(TransactionService.get_transaction_summary('alice', 'all')['transaction_count'], 3)
+
+    def test_summary_last_30_days(self):
+        self._add(40)
+        self._add(15, date=(datetime.now() - timedelta(days=10)).strftime('%Y-%m-%d'))
+        self._add(25, date=(datetime.now() - timedelta(days=45)).strftime('%Y-%m-%d'))
+
+        summary = TransactionService.get_transaction_summary('alice', 'last_30_days')
+
+        self.assertEqual(summary['total_expenses'], 55)
+        self.assertEqual(summary['transaction_count'], 2)
+
+    def test_summary_cache_is_invalidated_by_writes(self):
+        self._add(10)
+        self.assertEqual(TransactionService.get_transaction_summary('alice')['total_expenses'], 10)
+
+        # Writes that bypass TransactionService are served from cache until clear_cache
+        DatabaseService.add_transaction({'date': self.today, 'amount': 5, 'type': 'Expense'}, 'alice')
+        self.assertEqual(TransactionService.get_transaction_summary('alice')['total_expenses'], 10)
+
+        self._add(1)
+        self.assertEqual(TransactionService.get_transaction_summary('alice')['total_expenses'], 16)
+
+    def test_expired_summary_is_recomputed(self):
+        self._add(10)
+        TransactionService.get_transaction_summary('alice')
+        DatabaseService.add_transaction({'date': self.today, 'amount': 5, 'type': 'Expense'}, 'alice')
+        for key, (cache_time, summary) in list(TransactionService._summary_cache.items()):
+            TransactionService._summary_cache[key] = (cache_time - TransactionService.CACHE_TTL_SECONDS, summary)
+
+        self.assertEqual(TransactionService.get_transaction_summary('alice')['total_expenses'], 15)
+
+    def test_clear_cache_only_drops_that_users_summaries(self):
+        self._add(10)
+        self._add(7, user_id='bob')
+        TransactionService.get_transaction_summary('alice')
+        TransactionService.get_transaction_summary('bob')
+
+        TransactionService.clear_cache('alice')
+
+        self.assertEqual([key[0] for key in TransactionService._summary_cache], ['bob'])
+
+    def test_cached_summary_is_not_shared_with_callers(self):
+        self._add(10)
+        TransactionService.get_transaction_summary('alice')['total_expenses'] = 0
+
+        self.assertEqual(TransactionService.get_transaction_summary('alice')['total_expenses'], 10)
+
+    def test_totals_by_type_sums_loaded_transactions(self):
+        transactions = [
+            {'type': 'Income', 'amount': '100.5'},
+            {'type': 'Expense', 'amount': 20},
+            {'type': 'Expense', 'amount': None},
+            {'type': 'Refund', 'amount': 7},
+        ]
+
+        totals = TransactionService.totals_by_type(transactions)
+
+        self.assertEqual(totals, {'Income': 100.5, 'Expense': 20.0, 'Tax': 0.0, 'Investment': 0.0, 'Transfer': 0.0})
+
+    def test_totals_by_type_treats_unparseable_amount_as_zero(self):
+        transactions = [{'type': 'Expense', 'amount': 'abc'}, {'type': 'Expense', 'amount': 5}]
+
+        totals = TransactionService.totals_by_type(transactions)
+
+        self.assertEqual(totals['Expense'], 5.0)
+
+    def test_totals_by_type_above_vectorize_threshold(self):
+        transactions = [{'type': 'Expense', 'amount': 2}] * TransactionService.VECTORIZE_THRESHOLD
+        transactions += [{'type': 'Income', 'amount': '3.5'}, {'type': 'Refund', 'amount': 9}, {'type': 'Expense', 'amount': None}]
+
+        totals = TransactionService.totals_by_type(transactions)
+
+        self.assertEqual(totals['Expense'], 2.0 * TransactionService.VECTORIZE_THRESHOLD)
+        self.assertEqual(totals['Income'], 3.5)
+        self.assertEqual(totals['Transfer'], 0.0)
+
+
+class TestTransactionCache(DatabaseServiceTestCase):
+    def setUp(self):
+        super().setUp()
+        TransactionService._transactions_cache.clear()
+
+    def tearDown(self):
+        TransactionService._transactions_cache.clear()
+        super().tearDown()
+
+    def test_loaded_transactions_are_reused_until_cleared(self):
+        DatabaseService.add_transaction({'date': '2025-01-01', 'amount': 1, 'type': 'Expense'}, 'alice')
+        first = TransactionService.load_transactions('alice')
+
+        DatabaseService.add_transaction({'date': '2025-01-02', 'amount': 2, 'type': 'Expense'}, 'alice')
+        self.assertIs(TransactionService.load_transactions('alice'), first)
+
+        TransactionService.clear_cache('alice')
+        self.assertEqual(len(TransactionService.load_transactions('alice')), 2)
+
+    def test_expired_entries_are_reloaded(self):
+        TransactionService._cache_transactions('alice', [{'amount': 1}])
+        cache_time, rows = TransactionService._transactions_cache['alice']
+        TransactionService._transactions_cache['alice'] = (cache_time - TransactionService.CACHE_TTL_SECONDS, rows)
+
+        self.assertIsNone(TransactionService._get_cached_transactions('alice'))
+        self.assertNotIn('alice', TransactionService._transactions_cache)
+
+    def test_least_recently_used_user_is_evicted(self):
+        for index in range(TransactionService.CACHE_MAX_USERS):
+            TransactionService._cache_transactions(f'user{index}', [])
+        TransactionService._get_cached_transactions('user0')
+        TransactionService._cache_transactions('newcomer', [])
+
+        self.assertIn('user0', TransactionService._transactions_cache)
+        self.assertNotIn('user1', TransactionService._transactions_cache)
+        self.assertEqual(len(TransactionService._transactions_cache), TransactionService.CACHE_MAX_USERS)
+
+class TestNetWorth(DatabaseServiceTestCase):
+    def test_load_networth_groups_rows_without_type_keys(self):
+        NetWorthService.save_networth({
+            'investments': {'stocks': [{'name': 'Index fund', 'value': 100}], 'checking': [{'name': 'Checking', 'value': 5}]},
+            'debts': {'loans': [{'name': 'Car', 'value': 40}]},
+            'real_estate': [{'name': 'Home', 'current_value': 300}],
+        }, 'alice')
+
+        networth = NetWorthService.load_networth('alice')
+
+        self.assertEqual([a['name'] for a in networth['investments']['stocks']], ['Index fund'])
+        self.assertEqual([a['name'] for a in networth['investments']['savings']], ['Checking'])
+        self.assertNotIn('asset_type', networth['investments']['stocks'][0])
+        self.assertEqual(networth['debts']['loans'][0]['value'], 40)
+        self.assertNotIn('liability_type', networth['debts']['loans'][0])
+        self.assertEqual([p['name'] for p in networth['real_estate']], ['Home'])
+
+    def test_load_networth_returns_empty_groups_for_new_user(self):
+        networth = NetWorthService.load_networth('bob')
+
+        self.assertEqual(list(networth['investments']), list(NetWorthService.INVESTMENT_CATEGORIES))
+        self.assertEqual(networth['debts'], {'loans': [], 'credit_cards': [], 'mortgage': []})
+        self.assertEqual(networth['real_estate'], [])
+        self.assertEqual(networth['last_updated'], datetime.now().strftime('%Y-%m-%d'))
+
+if __name__ == "__main__":
+    unittest.main()
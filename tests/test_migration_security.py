@@ -79,6 +79,12 @@ class TestMigrationSecurity(unittest.TestCase):
         with self.assertRaises(ValueError):
             MigrationService._validate_column_definition("user_id", "")
 
+    def test_validate_column_definition_too_long(self):
+        with self.assertRaises(ValueError):
+            MigrationService._validate_column_definition(
+                "note", "note TEXT DEFAULT '" + "x" * 600 + "'"
+            )
+
     def test_validate_column_definition_invalid_types(self):
         with self.assertRaises(ValueError):
             MigrationService._validate_column_definition("user_id", "user_id JSON")
@@ -4,6 +4,9 @@ Authentication middleware for user data isolation
 import streamlit as st
 from functools import wraps
 
+# Distinguishes a missing session key from one stored as None
+_MISSING = object()
+
 class AuthMiddleware:
     """Authentication and authorization utilities"""
     
@@ -27,18 +30,23 @@ class AuthMiddleware:
     @staticmethod
     def get_current_user_id():
         """Get current authenticated user ID"""
-        if AuthMiddleware.is_authenticated():
-            # Check for ft_user_id first, then fallback to ft_user
-            if 'ft_user_id' in st.session_state:
-                return st.session_state.ft_user_id
-            elif 'ft_user' in st.session_state:
-                user_data = st.session_state.ft_user
-                # If ft_user is a dict, extract user_id
-                if isinstance(user_data, dict) and 'user_id' in user_data:
-                    return user_data['user_id']
-                # Otherwise return the whole object
-                return user_data
-        return None
+        # One session_state read per key: the proxy makes each `in` test and lookup costly
+        session = st.session_state
+        if not session.get('ft_authenticated', False):
+            return None
+        
+        # Check for ft_user_id first, then fallback to ft_user
+        user_id = session.get('ft_user_id', _MISSING)
+        if user_id is not _MISSING:
+            return user_id
+        user_data = session.get('ft_user', _MISSING)
+        if user_data is _MISSING:
+            return None
+        # If ft_user is a dict, extract user_id
+        if isinstance(user_data, dict) and 'user_id' in user_data:
+            return user_data['user_id']
+        # Otherwise return the whole object
+        return user_data
     
     @staticmethod
     def set_user_session(user_id, username=None):
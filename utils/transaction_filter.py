@@ -23,8 +23,17 @@ class TransactionFilter:
                 else:
                     AppLogger.log_error("No authenticated user found", show_user=False)
                     return []
-            transactions = DatabaseService.get_transactions(str(user_id))
-            AppLogger.log_info(f"Loaded {len(transactions)} transactions for user: {user_id}")
+            # The lower date bound is applied in SQL; only the upper bound is checked per row
+            if date_filter:
+                start_date, end_date = date_filter
+                since = start_date.strftime('%Y-%m-%d')
+                end_str = end_date.strftime('%Y-%m-%d')
+            else:
+                # Default to current month
+                since = datetime.now().strftime('%Y-%m')
+            
+            transactions = DatabaseService.get_transactions(str(user_id), since=since)
+            AppLogger.log_info(f"Loaded {len(transactions)} transactions since {since} for user: {user_id}")
             # Filter out transactions without user_id (legacy data)
             transactions = [t for t in transactions if t.get('user_id') == str(user_id)]
             
@@ -33,14 +42,9 @@ class TransactionFilter:
             
             # Apply date filter
             if date_filter:
-                start_date, end_date = date_filter
-                start_str = start_date.strftime('%Y-%m-%d')
-                end_str = end_date.strftime('%Y-%m-%d')
-                transactions = [t for t in transactions if start_str <= t.get('date', '') <= end_str]
+                transactions = [t for t in transactions if t.get('date', '') <= end_str]
             else:
-                # Default to current month
-                current_month = datetime.now().strftime('%Y-%m')
-                transactions = [t for t in transactions if t.get('date', '').startswith(current_month)]
+                transactions = [t for t in transactions if t.get('date', '')[:7] == since]
             
             # Apply other filters
             if filters: